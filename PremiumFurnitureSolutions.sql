@@ -4,6 +4,11 @@ DROP TABLE IF EXISTS products CASCADE;
 DROP TABLE IF EXISTS product_types CASCADE;
 DROP TABLE IF EXISTS material_types CASCADE;
 DROP TABLE IF EXISTS workshops CASCADE;
+DROP TABLE IF EXISTS import_row_hashes CASCADE;
+DROP TABLE IF EXISTS import_pending_indexes CASCADE;
+DROP TABLE IF EXISTS product_route_stats CASCADE;
+DROP TABLE IF EXISTS workshop_route_stats CASCADE;
+DROP TABLE IF EXISTS catalog_versions CASCADE;
 
 -- ============================================================================
 -- ТАБЛИЦА: material_types (Типы материалов)
@@ -102,6 +107,28 @@ CREATE TABLE product_workshops (
         ON UPDATE CASCADE
 );
 
+-- ============================================================================
+-- ТАБЛИЦА: import_row_hashes (Хеши импортированных строк)
+-- Описание: Служебная таблица дифференциального импорта (import_excel_data.py):
+-- хеш каждой загруженной строки по ее естественному ключу
+-- ============================================================================
+CREATE TABLE import_row_hashes (
+    table_name VARCHAR(64) NOT NULL,
+    row_key TEXT NOT NULL,
+    row_hash BIGINT NOT NULL,
+    PRIMARY KEY (table_name, row_key)
+);
+
+-- ============================================================================
+-- ТАБЛИЦА: import_pending_indexes (Индексы, ожидающие восстановления)
+-- Описание: Определения вторичных индексов, удаленных быстрой перезагрузкой
+-- (import_excel_data.py --fast-reset); строка удаляется после построения индекса
+-- ============================================================================
+CREATE TABLE import_pending_indexes (
+    index_name TEXT PRIMARY KEY,
+    index_definition TEXT NOT NULL
+);
+
 -- ============================================================================
 -- ИНДЕКСЫ для оптимизации запросов
 -- ============================================================================
@@ -111,6 +138,206 @@ CREATE INDEX idx_products_article_number ON products(article_number);
 CREATE INDEX idx_product_workshops_product_id ON product_workshops(product_id);
 CREATE INDEX idx_product_workshops_workshop_id ON product_workshops(workshop_id);
 
+-- Поиск продукции: нечеткое совпадение названия (триграммы) и префикс артикула
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_products_product_name_trgm ON products USING GIN (product_name gin_trgm_ops);
+CREATE INDEX idx_products_article_prefix ON products ((article_number::text) text_pattern_ops);
+
+-- ============================================================================
+-- АГРЕГАТЫ МАРШРУТОВ (поддерживаются триггерами)
+-- Описание: Суммарное время, число цехов и маршрут по каждому продукту и цеху.
+-- Пересчитываются только затронутые ключи — один раз на оператор, по таблицам
+-- переходов (REFERENCING), поэтому массовый COPY обходится одним пересчетом.
+-- Внешних ключей нет намеренно: таблицы производные и очищаются вместе с
+-- product_workshops (в т.ч. через TRUNCATE).
+-- route_version меняется при каждом пересчете маршрута продукта — по ней приложение
+-- проверяет свой кэш маршрутов. Последовательность не удаляется при переустановке,
+-- чтобы новые версии не совпали с уже закэшированными.
+-- ============================================================================
+CREATE SEQUENCE IF NOT EXISTS route_stats_version_seq;
+
+CREATE TABLE product_route_stats (
+    product_id INT PRIMARY KEY,
+    total_time_hours DECIMAL(10, 2) NOT NULL,
+    workshops_count INT NOT NULL,
+    workshops_list TEXT NOT NULL,
+    route JSONB NOT NULL,
+    route_version BIGINT NOT NULL DEFAULT nextval('route_stats_version_seq')
+);
+
+CREATE TABLE workshop_route_stats (
+    workshop_id INT PRIMARY KEY,
+    total_time_hours DECIMAL(12, 2) NOT NULL,
+    products_count INT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION refresh_route_stats(changed_products INT[], changed_workshops INT[])
+RETURNS VOID AS $$
+BEGIN
+    -- Параллельные транзакции пересчитывают одни и те же ключи по очереди: блокировки берутся
+    -- в порядке ключей до агрегации, поэтому следующий запрос (READ COMMITTED) уже видит
+    -- изменения транзакции, которая держала блокировку. Upsert вместо DELETE + INSERT
+    -- не дает нарушить первичный ключ, если строка статистики появилась параллельно
+    PERFORM pg_advisory_xact_lock(1, product_id)
+    FROM (SELECT DISTINCT UNNEST(changed_products) AS product_id ORDER BY 1) p;
+    PERFORM pg_advisory_xact_lock(2, workshop_id)
+    FROM (SELECT DISTINCT UNNEST(changed_workshops) AS workshop_id ORDER BY 1) w;
+    
+    INSERT INTO product_route_stats (product_id, total_time_hours, workshops_count, workshops_list, route)
+    SELECT 
+        pw.product_id,
+        SUM(pw.manufacturing_time_hours),
+        COUNT(*),
+        STRING_AGG(w.workshop_name, ', ' ORDER BY pw.manufacturing_time_hours DESC),
+        JSONB_AGG(
+            JSONB_BUILD_OBJECT(
+                'workshop_id', w.workshop_id,
+                'workshop_name', w.workshop_name,
+                'staff_count', w.staff_count,
+                'production_time', pw.manufacturing_time_hours
+            ) ORDER BY pw.manufacturing_time_hours DESC
+        )
+    FROM product_workshops pw
+    JOIN workshops w ON w.workshop_id = pw.workshop_id
+    WHERE pw.product_id = ANY(changed_products)
+    GROUP BY pw.product_id
+    ON CONFLICT (product_id) DO UPDATE SET
+        total_time_hours = EXCLUDED.total_time_hours,
+        workshops_count = EXCLUDED.workshops_count,
+        workshops_list = EXCLUDED.workshops_list,
+        route = EXCLUDED.route,
+        route_version = EXCLUDED.route_version;
+    
+    -- Продукты, у которых не осталось маршрута
+    DELETE FROM product_route_stats prs
+    WHERE prs.product_id = ANY(changed_products)
+      AND NOT EXISTS (SELECT 1 FROM product_workshops pw WHERE pw.product_id = prs.product_id);
+    
+    INSERT INTO workshop_route_stats (workshop_id, total_time_hours, products_count)
+    SELECT pw.workshop_id, SUM(pw.manufacturing_time_hours), COUNT(*)
+    FROM product_workshops pw
+    WHERE pw.workshop_id = ANY(changed_workshops)
+    GROUP BY pw.workshop_id
+    ON CONFLICT (workshop_id) DO UPDATE SET
+        total_time_hours = EXCLUDED.total_time_hours,
+        products_count = EXCLUDED.products_count;
+    
+    DELETE FROM workshop_route_stats wrs
+    WHERE wrs.workshop_id = ANY(changed_workshops)
+      AND NOT EXISTS (SELECT 1 FROM product_workshops pw WHERE pw.workshop_id = wrs.workshop_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Триггер с таблицами переходов допускает только одно событие,
+-- поэтому одна функция обслуживает три триггера и различает их по TG_OP
+CREATE OR REPLACE FUNCTION product_workshops_refresh_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_route_stats(
+            ARRAY(SELECT DISTINCT product_id FROM new_rows),
+            ARRAY(SELECT DISTINCT workshop_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_route_stats(
+            ARRAY(SELECT product_id FROM old_rows UNION SELECT product_id FROM new_rows),
+            ARRAY(SELECT workshop_id FROM old_rows UNION SELECT workshop_id FROM new_rows)
+        );
+    ELSE
+        PERFORM refresh_route_stats(
+            ARRAY(SELECT DISTINCT product_id FROM old_rows),
+            ARRAY(SELECT DISTINCT workshop_id FROM old_rows)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_product_workshops_stats_insert
+    AFTER INSERT ON product_workshops
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_workshops_refresh_stats();
+
+CREATE TRIGGER trg_product_workshops_stats_update
+    AFTER UPDATE ON product_workshops
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_workshops_refresh_stats();
+
+CREATE TRIGGER trg_product_workshops_stats_delete
+    AFTER DELETE ON product_workshops
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION product_workshops_refresh_stats();
+
+CREATE OR REPLACE FUNCTION product_workshops_truncate_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE product_route_stats, workshop_route_stats;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_product_workshops_stats_truncate
+    AFTER TRUNCATE ON product_workshops
+    FOR EACH STATEMENT EXECUTE FUNCTION product_workshops_truncate_stats();
+
+-- Название и численность цеха входят в маршрут продукта
+CREATE OR REPLACE FUNCTION workshops_refresh_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_route_stats(
+        ARRAY(
+            SELECT DISTINCT pw.product_id
+            FROM product_workshops pw
+            JOIN new_rows n ON n.workshop_id = pw.workshop_id
+        ),
+        '{}'
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_workshops_stats_update
+    AFTER UPDATE ON workshops
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION workshops_refresh_stats();
+
+-- ============================================================================
+-- ВЕРСИЯ КАТАЛОГА
+-- Описание: Меняется любым оператором над продукцией и справочниками типов и
+-- материалов — через API, импорт или вручную. Приложение держит фасеты в кэше
+-- по этой версии. Обновление строки транзакционно: до фиксации читатели видят
+-- прежнюю версию вместе с прежними данными. Значения берутся из последовательности,
+-- которая переживает переустановку схемы, — новые версии не совпадут с закэшированными.
+-- ============================================================================
+CREATE SEQUENCE IF NOT EXISTS catalog_version_seq;
+
+CREATE TABLE catalog_versions (
+    catalog_name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT nextval('catalog_version_seq')
+);
+
+INSERT INTO catalog_versions (catalog_name) VALUES ('products');
+
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE catalog_versions SET version = nextval('catalog_version_seq') WHERE catalog_name = 'products';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_products_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_product_types_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON product_types
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_material_types_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON material_types
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
 -- ============================================================================
 -- КОММЕНТАРИИ К ТАБЛИЦАМ И ПОЛЯМ
 -- ============================================================================
@@ -135,6 +362,10 @@ COMMENT ON COLUMN products.minimum_partner_price IS 'Минимальная це
 COMMENT ON TABLE product_workshops IS 'Маршрут производства (какие цехи участвуют в изготовлении продукции)';
 COMMENT ON COLUMN product_workshops.manufacturing_time_hours IS 'Время изготовления в цехе (в часах)';
 
+COMMENT ON TABLE product_route_stats IS 'Агрегаты маршрута по продукту (поддерживаются триггерами)';
+COMMENT ON TABLE workshop_route_stats IS 'Агрегаты загрузки по цеху (поддерживаются триггерами)';
+COMMENT ON TABLE catalog_versions IS 'Версия данных каталога для кэшей приложения (поддерживается триггерами)';
+
 -- ============================================================================
 -- ИМПОРТ ДАННЫХ
 -- ============================================================================
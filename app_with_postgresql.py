@@ -1,10 +1,25 @@
-from flask import Flask, render_template_string, jsonify, request, redirect, url_for, flash
+from flask import Flask, Response, g, has_request_context, render_template_string, jsonify, request, redirect, url_for, flash, stream_with_context
+import bisect
+import json
+import logging
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from decimal import Decimal
 import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import RotatingFileHandler
 from datetime import datetime
 
+from simple_import import split_sql_script
+from production_planning import (
+    PLANNING_HORIZON_HOURS, compute_lead_time, load_planning_data, load_route_models,
+    plan_capacity, schedule_orders
+)
+
 app = Flask(__name__)
 app.secret_key = 'premium-furniture-secret-key-2025'
 
@@ -17,11 +32,265 @@ DB_CONFIG = {
     'port': '5432'
 }
 
+# ==================== МЕТРИКИ ====================
+
+# Границы гистограмм длительности (секунды)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'http_request_duration_seconds': 'Длительность обработки HTTP-запроса',
+    'db_connect_duration_seconds': 'Время установки соединения с БД',
+    'db_execute_duration_seconds': 'Время выполнения SQL-команды',
+    'db_fetch_duration_seconds': 'Время получения строк результата'
+}
+
+def format_labels(labels):
+    """Метки в формате Prometheus: {name="value",...}"""
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+class Metrics:
+    """
+    Гистограммы длительностей и счетчик открытых соединений в памяти процесса.
+    Наблюдение — поиск корзины через bisect и инкремент под блокировкой;
+    экспорт в текстовом формате Prometheus без сторонних библиотек.
+    """
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.connections_in_use = 0
+        # (метрика, метки) -> [счетчики корзин..., сумма]
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, name, labels, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += seconds
+    
+    def connection_opened(self):
+        with self._lock:
+            self.connections_in_use += 1
+    
+    def connection_closed(self):
+        with self._lock:
+            self.connections_in_use -= 1
+    
+    def render(self, caches):
+        """Текст для /metrics: гистограммы, счетчик запросов, соединения и кэши"""
+        with self._lock:
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+            connections_in_use = self.connections_in_use
+        
+        lines = []
+        current = None
+        requests_total = []
+        for (name, labels), values in histograms:
+            if name != current:
+                current = name
+                lines.append(f'# HELP {name} {METRIC_HELP[name]}')
+                lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {values[-1]:.6f}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+            if name == 'http_request_duration_seconds':
+                requests_total.append(f'http_requests_total{format_labels(labels)} {cumulative}')
+        
+        lines.append('# HELP http_requests_total Количество HTTP-запросов')
+        lines.append('# TYPE http_requests_total counter')
+        lines.extend(requests_total)
+        
+        lines.append('# HELP db_connections_in_use Открытые соединения с БД')
+        lines.append('# TYPE db_connections_in_use gauge')
+        lines.append(f'db_connections_in_use {connections_in_use}')
+        
+        cache_metrics = (
+            ('cache_hits_total', 'counter', 'hits', 'Попадания в кэш'),
+            ('cache_misses_total', 'counter', 'misses', 'Промахи кэша'),
+            ('cache_size', 'gauge', 'size', 'Записей в кэше'),
+            ('cache_hit_ratio', 'gauge', 'hit_ratio', 'Доля попаданий в кэш')
+        )
+        stats = {cache_name: cache.stats() for cache_name, cache in caches.items()}
+        for name, metric_type, field, help_text in cache_metrics:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for cache_name, cache_stats in stats.items():
+                lines.append(f'{name}{format_labels((("cache", cache_name),))} {cache_stats[field]}')
+        
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics(LATENCY_BUCKETS)
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Соединение, которое учитывается в db_connections_in_use до закрытия"""
+    
+    def close(self):
+        if not self.closed:
+            METRICS.connection_closed()
+        super().close()
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor, замеряющий выполнение и получение строк с меткой функции-обработчика"""
+    
+    endpoint = 'unknown'
+    
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - started
+            METRICS.observe('db_execute_duration_seconds', (('endpoint', self.endpoint),), elapsed)
+        
+        if elapsed >= SLOW_QUERY_THRESHOLD_SECONDS:
+            log_slow_query(self, query, vars, elapsed)
+        return result
+    
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            METRICS.observe('db_fetch_duration_seconds', (('endpoint', self.endpoint),), time.perf_counter() - started)
+    
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(size)
+        finally:
+            METRICS.observe('db_fetch_duration_seconds', (('endpoint', self.endpoint),), time.perf_counter() - started)
+    
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            METRICS.observe('db_fetch_duration_seconds', (('endpoint', self.endpoint),), time.perf_counter() - started)
+
+# ==================== ЖУРНАЛ МЕДЛЕННЫХ ЗАПРОСОВ ====================
+
+# Порог, доля запросов с планом EXPLAIN и файл журнала задаются переменными окружения
+SLOW_QUERY_THRESHOLD_SECONDS = float(os.environ.get('SLOW_QUERY_THRESHOLD_SECONDS', '0.5'))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', 'slow_queries.log')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Только чтение: EXPLAIN ANALYZE выполняет команду повторно. WITH может содержать
+# изменяющие CTE (INSERT/UPDATE/DELETE/MERGE) — такие команды, как и SELECT ... FOR UPDATE,
+# не объясняются; ложное срабатывание на слове в строке лишь оставляет запись без плана
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH')
+DATA_MODIFYING_KEYWORDS = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE)\b', re.IGNORECASE)
+
+slow_query_logger = logging.getLogger('slow_queries')
+slow_query_logger.setLevel(logging.INFO)
+slow_query_logger.propagate = False
+# delay=True: файл создается только при первой медленной команде
+slow_query_handler = RotatingFileHandler(
+    SLOW_QUERY_LOG_FILE,
+    maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+    backupCount=SLOW_QUERY_LOG_BACKUPS,
+    encoding='utf-8',
+    delay=True
+)
+slow_query_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+slow_query_logger.addHandler(slow_query_handler)
+
+def explain_statement(connection, query, vars):
+    """
+    План EXPLAIN (ANALYZE, BUFFERS) для команды. Выполняется отдельным курсором внутри
+    SAVEPOINT, который затем откатывается: результат и транзакция запроса не меняются.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + query, vars)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    except Exception as e:
+        return f'EXPLAIN не выполнен: {e}'
+    finally:
+        cursor.close()
+
+def is_explainable(query):
+    """Команда только читает данные и ее можно повторить под EXPLAIN ANALYZE"""
+    words = query.split(None, 1)
+    return (bool(words) and words[0].upper() in EXPLAINABLE_STATEMENTS
+            and not DATA_MODIFYING_KEYWORDS.search(query))
+
+def log_slow_query(cursor, query, vars, elapsed):
+    """Пишет медленную команду в журнал; для выборки только на чтение — с планом EXPLAIN"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8')
+    entry = {
+        'endpoint': cursor.endpoint,
+        'duration_ms': round(elapsed * 1000, 3),
+        'rows': cursor.rowcount,
+        'query': ' '.join(query.split()),
+        'params': vars
+    }
+    
+    if is_explainable(query) and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        entry['plan'] = explain_statement(cursor.connection, query, vars)
+    
+    try:
+        slow_query_logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+    except Exception as e:
+        print(f"⚠️ Не удалось записать медленный запрос в журнал: {e}")
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def remember_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc):
+    """
+    Запрос учитывается при завершении контекста: after_request пропускается, если
+    обработчик упал с исключением, а такие 500 важнее всего. Соединения, которые
+    обработчик не закрыл, закрываются здесь — счетчик открытых соединений не растет
+    """
+    for conn in g.pop('db_connections', ()):
+        if not conn.closed:
+            conn.close()
+    
+    started = g.pop('request_started', None)
+    if started is not None:
+        status = 500 if exc is not None else g.pop('response_status', 500)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (('method', request.method), ('route', route), ('status', status))
+        METRICS.observe('http_request_duration_seconds', labels, time.perf_counter() - started)
+
 def get_db_connection():
     """Создает соединение с базой данных"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        started = time.perf_counter()
+        conn = psycopg2.connect(connection_factory=InstrumentedConnection, **DB_CONFIG)
+        METRICS.observe('db_connect_duration_seconds', (), time.perf_counter() - started)
+        METRICS.connection_opened()
         conn.autocommit = False
+        if has_request_context():
+            g.setdefault('db_connections', []).append(conn)
         return conn
     except Exception as e:
         print(f"❌ Ошибка подключения к БД: {e}")
@@ -60,17 +329,13 @@ def init_database():
             with open('PremiumFurnitureSolutions.sql', 'r', encoding='utf-8') as f:
                 sql_script = f.read()
             
-            # Разделяем скрипт на отдельные команды
-            commands = sql_script.split(';')
-            
-            for command in commands:
-                command = command.strip()
-                if command and not command.startswith('--'):
-                    try:
-                        cur.execute(command)
-                    except Exception as e:
-                        print(f"⚠️ Ошибка выполнения команды: {e}")
-                        continue
+            # Разделяем скрипт на отдельные команды (с учетом блоков $$ в функциях)
+            for command in split_sql_script(sql_script):
+                try:
+                    cur.execute(command)
+                except Exception as e:
+                    print(f"⚠️ Ошибка выполнения команды: {e}")
+                    continue
             
             conn.commit()
             cur.close()
@@ -90,7 +355,8 @@ def with_db_connection(func):
             if not conn:
                 return jsonify({'error': 'Database connection failed'}), 500
             
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor(cursor_factory=InstrumentedCursor)
+            cursor.endpoint = func.__name__
             kwargs['cursor'] = cursor
             kwargs['connection'] = conn
             
@@ -113,6 +379,105 @@ def with_db_connection(func):
     wrapper.__name__ = func.__name__
     return wrapper
 
+# ==================== КЭШ РАСЧЕТОВ ====================
+
+# Маршрут продукта кэшируется по ключу (product_id, route_version из product_route_stats):
+# триггеры меняют версию при любом изменении маршрута или цехов продукта, поэтому устаревшая
+# запись больше не находится. TTL и размер только ограничивают память
+LEAD_TIME_CACHE_TTL = 300
+LEAD_TIME_CACHE_SIZE = 10000
+
+class MemoCache:
+    """Потокобезопасный кэш с ограничением размера (LRU), временем жизни и счетчиками попаданий"""
+    
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Значение из кэша или None, если его нет или оно устарело"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                self.misses += 1
+                if item is not None:
+                    del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+    
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._items),
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+LEAD_TIME_CACHE = MemoCache(LEAD_TIME_CACHE_TTL, LEAD_TIME_CACHE_SIZE)
+
+ROUTE_VERSIONS_QUERY = '''
+    SELECT product_id, route_version
+    FROM product_route_stats
+    WHERE product_id = ANY(%s)
+'''
+
+def get_route_models(cursor, product_ids):
+    """Маршруты продуктов: из кэша, если версия маршрута не изменилась, а остальные — одним запросом"""
+    cursor.execute(ROUTE_VERSIONS_QUERY, (list(product_ids),))
+    # У продукта без маршрута строки статистики нет — его версия None
+    versions = {row['product_id']: row['route_version'] for row in cursor.fetchall()}
+    
+    models = {}
+    missing = []
+    for product_id in product_ids:
+        model = LEAD_TIME_CACHE.get((product_id, versions.get(product_id)))
+        if model is None:
+            missing.append(product_id)
+        else:
+            models[product_id] = model
+    
+    if missing:
+        # Версия прочитана до маршрута: если маршрут успел измениться, запись просто перечитается
+        for product_id, model in load_route_models(cursor, missing).items():
+            LEAD_TIME_CACHE.set((product_id, versions.get(product_id)), model)
+            models[product_id] = model
+    
+    return models
+
+def production_time_summary(route, quantity=1):
+    """Срок изготовления по критическому пути и прежние поля ответа (сумма часов, список цехов)"""
+    workshops = [workshop for stage in route for workshop in stage['workshops']]
+    summary = compute_lead_time(route, quantity)
+    summary.update({
+        'total_time': round(sum(workshop['hours'] for workshop in workshops), 2),
+        'workshops_count': len(workshops),
+        'workshops_list': ', '.join(workshop['workshop_name'] for workshop in workshops)
+    })
+    return summary
+
 # ==================== API ENDPOINTS ====================
 
 @app.route('/')
@@ -209,7 +574,14 @@ def get_material_types(cursor, connection):
 @with_db_connection
 def get_workshops(cursor, connection):
     """Получение списка цехов"""
-    cursor.execute('SELECT workshop_id as id, workshop_name as name, staff_count as people_count, workshop_type FROM workshops')
+    cursor.execute('''
+        SELECT 
+            w.workshop_id as id, w.workshop_name as name, w.staff_count as people_count, w.workshop_type,
+            COALESCE(s.products_count, 0) as products_count,
+            COALESCE(s.total_time_hours, 0)::float as total_hours
+        FROM workshops w
+        LEFT JOIN workshop_route_stats s ON s.workshop_id = w.workshop_id
+    ''')
     workshops = cursor.fetchall()
     
     # Для совместимости с фронтендом добавляем фиктивное production_time
@@ -293,27 +665,500 @@ def api_calculate_raw_materials(cursor, connection):
 @app.route('/api/calculate-production-time/<int:product_id>', methods=['GET'])
 @with_db_connection
 def calculate_production_time(product_id, cursor, connection):
-    """Расчет времени производства для продукта"""
-    query = '''
+    """
+    Расчет времени производства для продукта: срок по критическому пути с учетом численности цехов
+    (lead_time_hours) и суммарная трудоемкость маршрута (total_time)
+    """
+    try:
+        quantity = int(request.args.get('quantity', 1))
+        route = get_route_models(cursor, [product_id])[product_id]
+        return jsonify(production_time_summary(route, quantity))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/lead-times', methods=['GET'])
+@with_db_connection
+def get_lead_times(cursor, connection):
+    """Сроки изготовления по критическому пути для всего каталога (или списка ids=1,2,3)"""
+    try:
+        quantity = int(request.args.get('quantity', 1))
+        if request.args.get('ids'):
+            product_ids = [int(product_id) for product_id in request.args['ids'].split(',')]
+        else:
+            cursor.execute('SELECT product_id FROM products ORDER BY product_id')
+            product_ids = [row['product_id'] for row in cursor.fetchall()]
+        
+        routes = get_route_models(cursor, product_ids)
+        lead_times = []
+        for product_id in product_ids:
+            summary = compute_lead_time(routes[product_id], quantity)
+            lead_times.append({
+                'product_id': product_id,
+                'lead_time_hours': summary['lead_time_hours'],
+                'work_hours': summary['work_hours'],
+                'critical_path': summary['critical_path']
+            })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'quantity': quantity, 'products': lead_times, 'cache': LEAD_TIME_CACHE.stats()})
+
+# ==================== ПОИСК ПРОДУКЦИИ ====================
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_INDEX_TTL = 60
+
+# Нечеткое совпадение названия (pg_trgm, индекс idx_products_product_name_trgm) или
+# префикс артикула (idx_products_article_prefix). Точный артикул — выше всех,
+# префикс артикула — выше любого совпадения по названию.
+PRODUCT_SEARCH_QUERY = '''
+SELECT 
+    p.product_id as id,
+    p.article_number as article,
+    p.product_name as name,
+    p.minimum_partner_price as min_price,
+    p.product_type_id,
+    p.material_type_id,
+    pt.product_type_name,
+    mt.material_type_name as material_name,
+    GREATEST(
+        CASE 
+            WHEN p.article_number::text = %(query)s THEN 2.0
+            WHEN p.article_number::text LIKE %(prefix)s THEN 1.0
+            ELSE 0.0
+        END,
+        word_similarity(%(query)s, p.product_name)
+    ) as score,
+    COUNT(*) OVER () as total
+FROM products p
+JOIN product_types pt ON p.product_type_id = pt.product_type_id
+JOIN material_types mt ON p.material_type_id = mt.material_type_id
+WHERE p.article_number::text LIKE %(prefix)s
+   OR p.product_name ILIKE %(contains)s
+   OR %(query)s <%% p.product_name
+ORDER BY score DESC, p.product_name
+LIMIT %(limit)s OFFSET %(offset)s
+'''
+
+def escape_like(value):
+    """Экранирует спецсимволы LIKE, чтобы запрос пользователя искался буквально"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+class PrefixIndex:
+    """
+    Отсортированные ключи автодополнения (артикул, название и отдельные слова названия
+    в нижнем регистре) с поиском префикса через bisect — без обращения к БД.
+    Перестраивается после изменения продукции или по истечении ttl.
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._expires = 0
+        # (ключи, id продуктов, продукты по id) заменяются целиком одной ссылкой
+        self._state = ([], [], {})
+    
+    def stale(self):
+        return self._expires < time.monotonic()
+    
+    def build(self, products):
+        pairs = []
+        for product in products:
+            name = product['name'].lower()
+            keys = {str(product['article']), name, *name.split()}
+            pairs.extend((key, product['id']) for key in keys)
+        pairs.sort()
+        
+        self._state = (
+            [key for key, _ in pairs],
+            [product_id for _, product_id in pairs],
+            {product['id']: product for product in products}
+        )
+        self._expires = time.monotonic() + self.ttl
+    
+    def invalidate(self):
+        self._expires = 0
+    
+    def lookup(self, prefix, limit):
+        """Продукты, у которых артикул, название или слово названия начинается с prefix"""
+        keys, product_ids, products = self._state
+        prefix = prefix.lower()
+        found = {}
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and len(found) < limit and keys[position].startswith(prefix):
+            found.setdefault(product_ids[position], products[product_ids[position]])
+            position += 1
+        return list(found.values())
+
+PRODUCT_PREFIX_INDEX = PrefixIndex(AUTOCOMPLETE_INDEX_TTL)
+
+def product_written():
+    """Отмечает изменение продукции через API: индекс автодополнения устаревает"""
+    PRODUCT_PREFIX_INDEX.invalidate()
+
+def refresh_prefix_index():
+    """Перестраивает индекс автодополнения по таблице products"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute('SELECT product_id as id, article_number as article, product_name as name FROM products')
+        PRODUCT_PREFIX_INDEX.build(cursor.fetchall())
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка построения индекса автодополнения: {e}")
+        return False
+    finally:
+        conn.close()
+
+def page_params(default_limit, max_limit):
+    """limit и offset из строки запроса с проверкой границ; нечисловое значение — ошибка, а не умолчание"""
+    message = f'limit должен быть целым числом от 1 до {max_limit}, offset — целым неотрицательным'
+    try:
+        limit = int(request.args.get('limit', default_limit))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        raise ValueError(message) from None
+    if not 0 < limit <= max_limit or offset < 0:
+        raise ValueError(message)
+    return limit, offset
+
+@app.route('/api/products/search', methods=['GET'])
+@with_db_connection
+def search_products(cursor, connection):
+    """Нечеткий поиск по названию и поиск по префиксу артикула: ?q=&limit=&offset="""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Параметр q обязателен'}), 400
+    try:
+        limit, offset = page_params(SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    escaped = escape_like(query)
+    cursor.execute(PRODUCT_SEARCH_QUERY, {
+        'query': query,
+        'prefix': escaped + '%',
+        'contains': '%' + escaped + '%',
+        'limit': limit,
+        'offset': offset
+    })
+    products = cursor.fetchall()
+    
+    total = products[0]['total'] if products else 0
+    for product in products:
+        product['min_price'] = float(product['min_price'])
+        product['score'] = round(float(product['score']), 4)
+        del product['total']
+    
+    return jsonify({
+        'query': query,
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'items': products
+    })
+
+@app.route('/api/products/autocomplete', methods=['GET'])
+def autocomplete_products():
+    """Автодополнение по префиксу артикула или слова названия из индекса в памяти"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify([])
+    try:
+        limit, _ = page_params(AUTOCOMPLETE_LIMIT, SEARCH_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if PRODUCT_PREFIX_INDEX.stale() and not refresh_prefix_index():
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    return jsonify(PRODUCT_PREFIX_INDEX.lookup(query, limit))
+
+# ==================== ФАСЕТЫ КАТАЛОГА ====================
+
+# Границы ценовых диапазонов (₽): до 20 000, 20 000–50 000, ..., от 200 000
+PRICE_BUCKET_BOUNDS = [20000, 50000, 100000, 200000]
+# Ключ кэша включает версию каталога из catalog_versions: ее меняют триггеры при любой
+# записи в продукцию и справочники, в том числе при импорте, поэтому TTL только ограничивает память
+FACETS_CACHE_TTL = 300
+FACETS_CACHE_SIZE = 1000
+
+CATALOG_VERSION_QUERY = "SELECT version FROM catalog_versions WHERE catalog_name = 'products'"
+
+# Все фасеты за один проход: GROUPING(...) отличает наборы группировки
+# (3 — по типу, 5 — по материалу, 6 — по цене, 7 — итог)
+FACETS_QUERY = '''
+WITH filtered AS (
     SELECT 
-        SUM(pw.manufacturing_time_hours) as total_time,
-        COUNT(*) as workshops_count,
-        STRING_AGG(w.workshop_name, ', ') as workshops_list
-    FROM product_workshops pw
-    JOIN workshops w ON pw.workshop_id = w.workshop_id
-    WHERE pw.product_id = %s
-    '''
-    cursor.execute(query, (product_id,))
-    result = cursor.fetchone()
+        p.product_type_id,
+        pt.product_type_name,
+        p.material_type_id,
+        mt.material_type_name,
+        WIDTH_BUCKET(p.minimum_partner_price, %(bounds)s::numeric[]) as price_bucket
+    FROM products p
+    JOIN product_types pt ON p.product_type_id = pt.product_type_id
+    JOIN material_types mt ON p.material_type_id = mt.material_type_id
+    WHERE (%(product_type_id)s::int IS NULL OR p.product_type_id = %(product_type_id)s)
+      AND (%(material_type_id)s::int IS NULL OR p.material_type_id = %(material_type_id)s)
+      AND (%(min_price)s::numeric IS NULL OR p.minimum_partner_price >= %(min_price)s)
+      AND (%(max_price)s::numeric IS NULL OR p.minimum_partner_price <= %(max_price)s)
+)
+SELECT 
+    GROUPING(product_type_id, material_type_id, price_bucket) as grouping_set,
+    product_type_id,
+    product_type_name,
+    material_type_id,
+    material_type_name,
+    price_bucket,
+    COUNT(*) as count
+FROM filtered
+GROUP BY GROUPING SETS (
+    (product_type_id, product_type_name),
+    (material_type_id, material_type_name),
+    (price_bucket),
+    ()
+)
+'''
+
+FACETS_CACHE = MemoCache(FACETS_CACHE_TTL, FACETS_CACHE_SIZE)
+
+def finite_decimal(value):
+    """Decimal из строки; NaN и бесконечности — ValueError"""
+    number = Decimal(value)
+    if not number.is_finite():
+        raise ValueError(f'Цена должна быть конечным числом: {value}')
+    return number
+
+def facet_filter():
+    """Фильтр фасетов из строки запроса (ValueError при неверных значениях)"""
+    def optional(name, convert):
+        value = request.args.get(name)
+        return convert(value) if value not in (None, '') else None
     
-    if result and result['total_time']:
-        return jsonify({
-            'total_time': float(result['total_time']),
-            'workshops_count': result['workshops_count'],
-            'workshops_list': result['workshops_list']
-        })
-    else:
-        return jsonify({'total_time': 0, 'workshops_count': 0, 'workshops_list': ''})
+    return {
+        'product_type_id': optional('product_type_id', int),
+        'material_type_id': optional('material_type_id', int),
+        'min_price': optional('min_price', finite_decimal),
+        'max_price': optional('max_price', finite_decimal)
+    }
+
+def price_bucket_range(bucket):
+    """Границы ценового диапазона по номеру WIDTH_BUCKET (None — без ограничения)"""
+    bounds = [None] + PRICE_BUCKET_BOUNDS + [None]
+    return {'min_price': bounds[bucket], 'max_price': bounds[bucket + 1]}
+
+def build_facets(rows):
+    """Раскладывает строки GROUPING SETS по фасетам"""
+    facets = {'total': 0, 'product_types': [], 'materials': [], 'price_buckets': []}
+    for row in rows:
+        if row['grouping_set'] == 3:
+            facets['product_types'].append({
+                'id': row['product_type_id'], 'name': row['product_type_name'], 'count': row['count']
+            })
+        elif row['grouping_set'] == 5:
+            facets['materials'].append({
+                'id': row['material_type_id'], 'name': row['material_type_name'], 'count': row['count']
+            })
+        elif row['grouping_set'] == 6:
+            facets['price_buckets'].append(dict(price_bucket_range(row['price_bucket']), count=row['count']))
+        else:
+            facets['total'] = row['count']
+    
+    facets['product_types'].sort(key=lambda facet: (-facet['count'], facet['name']))
+    facets['materials'].sort(key=lambda facet: (-facet['count'], facet['name']))
+    facets['price_buckets'].sort(key=lambda facet: facet['min_price'] or 0)
+    return facets
+
+@app.route('/api/products/facets', methods=['GET'])
+@with_db_connection
+def get_product_facets(cursor, connection):
+    """
+    Количество продукции по типам, материалам и ценовым диапазонам для фильтра
+    ?product_type_id=&material_type_id=&min_price=&max_price= одним запросом GROUPING SETS.
+    """
+    try:
+        filters = facet_filter()
+    except (ValueError, ArithmeticError):
+        return jsonify({'error': 'Неверное значение фильтра'}), 400
+    
+    cursor.execute(CATALOG_VERSION_QUERY)
+    key = (cursor.fetchone()['version'], tuple(sorted(filters.items())))
+    facets = FACETS_CACHE.get(key)
+    if facets is None:
+        cursor.execute(FACETS_QUERY, dict(filters, bounds=PRICE_BUCKET_BOUNDS))
+        facets = build_facets(cursor.fetchall())
+        FACETS_CACHE.set(key, facets)
+    
+    applied = {
+        name: float(value) if isinstance(value, Decimal) else value
+        for name, value in filters.items() if value is not None
+    }
+    return jsonify(dict(facets, filter=applied))
+
+# ==================== МОНИТОРИНГ ====================
+
+# Кэши, попадания в которые выводятся в /metrics
+MONITORED_CACHES = {
+    'lead_time': LEAD_TIME_CACHE,
+    'facets': FACETS_CACHE
+}
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return Response(METRICS.render(MONITORED_CACHES), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# ==================== ВРЕМЯ ПРОИЗВОДСТВА ДЛЯ МНОГИХ ПРОДУКТОВ ====================
+
+# Списки длиннее порога (и весь каталог) отдаются потоком, строки читаются порциями
+PRODUCTION_TIMES_STREAM_THRESHOLD = 500
+PRODUCTION_TIMES_FETCH_SIZE = 1000
+
+# Агрегаты читаются из product_route_stats, которую поддерживают триггеры на product_workshops
+PRODUCTION_TIMES_QUERY = '''
+SELECT 
+    p.product_id,
+    COALESCE(s.total_time_hours, 0) as total_time,
+    COALESCE(s.workshops_count, 0) as workshops_count,
+    COALESCE(s.workshops_list, '') as workshops_list,
+    COALESCE(s.route, '[]') as workshops
+FROM products p
+LEFT JOIN product_route_stats s ON s.product_id = p.product_id
+WHERE %(all_products)s OR p.product_id = ANY(%(product_ids)s)
+ORDER BY p.product_id
+'''
+
+def production_time_row(row):
+    """Строка результата в формате JSON-ответа"""
+    return {
+        'product_id': row['product_id'],
+        'total_time': float(row['total_time']),
+        'workshops_count': row['workshops_count'],
+        'workshops_list': row['workshops_list'],
+        'workshops': row['workshops']
+    }
+
+def stream_production_times(conn, params):
+    """Генерирует JSON-массив, читая строки серверным курсором порциями"""
+    try:
+        cursor = conn.cursor(name='production_times', cursor_factory=InstrumentedCursor)
+        cursor.endpoint = 'get_production_times'
+        cursor.execute(PRODUCTION_TIMES_QUERY, params)
+        
+        # Порции читаются явным fetchmany: итерация серверного курсора идет мимо
+        # InstrumentedCursor, и время выборки не попало бы в метрики
+        yield '['
+        separator = ''
+        rows = cursor.fetchmany(PRODUCTION_TIMES_FETCH_SIZE)
+        while rows:
+            for row in rows:
+                yield separator + json.dumps(production_time_row(row), ensure_ascii=False)
+                separator = ','
+            rows = cursor.fetchmany(PRODUCTION_TIMES_FETCH_SIZE)
+        yield ']'
+        
+        cursor.close()
+    except Exception as e:
+        # Заголовки уже отправлены: сообщаем об ошибке в логе и обрываем поток
+        print(f"❌ Ошибка БД в функции stream_production_times: {e}")
+        raise
+    finally:
+        conn.rollback()
+        conn.close()
+
+@app.route('/api/production-times', methods=['GET', 'POST'])
+def get_production_times():
+    """
+    Время производства, число цехов и маршрут для списка продуктов одним сгруппированным запросом.
+    Список id: ?ids=1,2,3 или JSON {"ids": [...]}; без списка — весь каталог.
+    """
+    try:
+        if request.method == 'POST':
+            payload = request.get_json(silent=True)
+            if payload is None:
+                payload = {}
+            if not isinstance(payload, dict):
+                return jsonify({'error': 'Тело запроса должно быть JSON-объектом {"ids": [...]}'}), 400
+            product_ids = payload.get('ids')
+        else:
+            product_ids = request.args.get('ids')
+            product_ids = product_ids.split(',') if product_ids else None
+        if product_ids is not None:
+            product_ids = [int(product_id) for product_id in product_ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids должен быть списком целых чисел'}), 400
+    
+    params = {'all_products': product_ids is None, 'product_ids': product_ids or []}
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    if product_ids is None or len(product_ids) > PRODUCTION_TIMES_STREAM_THRESHOLD:
+        # Соединение живет дольше запроса: teardown его не закрывает, это делают генератор
+        # или call_on_close
+        g.db_connections.remove(conn)
+        response = Response(stream_with_context(stream_production_times(conn, params)), mimetype='application/json')
+        # Генератор закрывает соединение сам, но если клиент отключился до начала чтения,
+        # его finally не выполнится — соединение закрывается вместе с ответом
+        response.call_on_close(conn.close)
+        return response
+    
+    try:
+        cursor = conn.cursor(cursor_factory=InstrumentedCursor)
+        cursor.endpoint = 'get_production_times'
+        cursor.execute(PRODUCTION_TIMES_QUERY, params)
+        return jsonify([production_time_row(row) for row in cursor.fetchall()])
+    except Exception as e:
+        print(f"❌ Ошибка БД в функции get_production_times: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.rollback()
+        conn.close()
+
+# ==================== ПЛАНИРОВАНИЕ ПРОИЗВОДСТВА ====================
+
+@app.route('/api/planning/capacity', methods=['POST'])
+@with_db_connection
+def plan_workshop_capacity(cursor, connection):
+    """Загрузка цехов портфелем заказов: человеко-часы, загрузка и узкие места"""
+    data = request.json or {}
+    orders = data.get('orders') or []
+    
+    if not orders:
+        return jsonify({'error': 'Передайте список заказов orders'}), 400
+    
+    routes, workshops = load_planning_data(cursor)
+    
+    try:
+        horizon_hours = float(data.get('horizon_hours', PLANNING_HORIZON_HOURS))
+        plan = plan_capacity(orders, routes, workshops, horizon_hours)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Некорректный портфель заказов: {e}'}), 400
+    
+    return jsonify(plan)
+
+@app.route('/api/planning/schedule', methods=['POST'])
+@with_db_connection
+def schedule_workshop_orders(cursor, connection):
+    """Расписание заказов с учетом числа сотрудников в цехах: сроки по заказам, цехам и makespan"""
+    data = request.json or {}
+    orders = data.get('orders') or []
+    
+    if not orders:
+        return jsonify({'error': 'Передайте список заказов orders'}), 400
+    
+    routes, workshops = load_planning_data(cursor)
+    
+    try:
+        schedule = schedule_orders(orders, routes, workshops, bool(data.get('include_operations')))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Некорректный портфель заказов: {e}'}), 400
+    
+    return jsonify(schedule)
 
 # ==================== CRUD ОПЕРАЦИИ ДЛЯ ПРОДУКЦИИ ====================
 
@@ -358,6 +1203,10 @@ def add_product(cursor, connection):
         cursor.execute(query, (article, name, product_type_id, material_type_id, min_price))
         new_id = cursor.fetchone()['product_id']
         
+        # Кэши сбрасываются после фиксации: иначе параллельный запрос закэширует старые данные
+        connection.commit()
+        product_written()
+        
         return jsonify({
             'success': True,
             'message': 'Продукт успешно добавлен',
@@ -417,6 +1266,11 @@ def update_product(product_id, cursor, connection):
         
         cursor.execute(query, (article, name, product_type_id, material_type_id, min_price, product_id))
         
+        # Кэши сбрасываются после фиксации: иначе параллельный запрос закэширует старые данные.
+        # Маршрут при правке продукта не меняется — кэш сроков проверяет route_version сам
+        connection.commit()
+        product_written()
+        
         return jsonify({
             'success': True,
             'message': 'Продукт успешно обновлен'
@@ -438,6 +1292,10 @@ def delete_product(product_id, cursor, connection):
         # Удаляем продукт (CASCADE удалит связанные записи в product_workshops)
         cursor.execute('DELETE FROM products WHERE product_id = %s', (product_id,))
         
+        # Кэши сбрасываются после фиксации: иначе параллельный запрос закэширует старые данные
+        connection.commit()
+        product_written()
+        
         return jsonify({
             'success': True,
             'message': 'Продукт успешно удален'
@@ -1442,15 +2300,19 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             }
 
             try {
-                const response = await fetch(`/api/calculate-production-time/${productId}`);
-                const data = await response.json();
+                // Время и маршрут по цехам приходят одним запросом
+                const response = await fetch(`/api/production-times?ids=${productId}`);
+                const result = await response.json();
                 
-                if (response.ok) {
+                if (!response.ok) {
+                    showAlert('❌ ' + (result.error || 'Ошибка расчета времени'), 'error', 'alert-container-time');
+                    return;
+                }
+                
+                const [data] = result;
+                if (data) {
                     const product = products.find(p => p.id === productId);
-                    
-                    // Получаем детали по цехам
-                    const workshopsResponse = await fetch(`/api/product-workshops/${productId}`);
-                    const workshopsData = await workshopsResponse.json();
+                    const workshopsData = data.workshops;
                     
                     let workshopsDetails = '';
                     if (workshopsData && workshopsData.length > 0) {
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки Premium Furniture Solutions
+
+Запуск:
+    python benchmarks.py import-formats --rows 20000
+    python benchmarks.py product-store --products 1000000
+    python benchmarks.py raw-materials --calls 200000
+    python benchmarks.py raw-materials-batch --rows 1000000
+    python benchmarks.py persistence --products 1000000
+    python benchmarks.py capacity-plan --lines 100000
+    python benchmarks.py schedule --orders 1000 5000 20000 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import import_excel_data
+import main as furniture_app
+import production_planning
+
+
+def measure(func, repeats):
+    """Возвращает лучшее время выполнения функции (в секундах) из нескольких запусков"""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+# ==================== ФОРМАТЫ ИСТОЧНИКОВ ИМПОРТА ====================
+
+def make_product_workshops_frame(rows):
+    """Генерирует синтетическую выгрузку маршрутов продукции"""
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'Наименование продукции': [f"Изделие {i // 4}" for i in range(rows)],
+        'Название цеха': [f"Цех {i % 12}" for i in range(rows)],
+        'Время изготовления, ч': rng.integers(1, 500, rows) / 10
+    })
+
+
+def benchmark_import_formats(rows, repeats):
+    """Сравнивает время чтения одного и того же источника в форматах xlsx, csv и parquet"""
+    print(f"📊 Чтение product_workshops: {rows} строк, лучший из {repeats} запусков")
+
+    df = make_product_workshops_frame(rows)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = {
+            'xlsx': os.path.join(tmpdir, 'Product_workshops_import.xlsx'),
+            'csv': os.path.join(tmpdir, 'Product_workshops_import.csv'),
+            'parquet': os.path.join(tmpdir, 'Product_workshops_import.parquet')
+        }
+
+        df.to_excel(
+            files['xlsx'],
+            sheet_name=import_excel_data.EXCEL_SHEETS['product_workshops'],
+            index=False
+        )
+        df.to_csv(files['csv'], index=False, encoding=import_excel_data.CSV_OPTIONS['encoding'])
+        df.to_parquet(files['parquet'], index=False, engine='pyarrow')
+
+        results = {}
+        for source_format, filename in files.items():
+            results[source_format] = measure(
+                lambda: import_excel_data.read_source('product_workshops', filename),
+                repeats
+            )
+
+        for source_format, filename in files.items():
+            size_kb = os.path.getsize(filename) / 1024
+            elapsed = results[source_format]
+            speedup = results['xlsx'] / elapsed if elapsed else float('inf')
+            print(f"   📄 {source_format:<8} {elapsed * 1000:10.1f} мс  "
+                  f"{rows / elapsed:12.0f} строк/с  {size_kb:10.1f} KB  x{speedup:.1f}")
+
+    return results
+
+
+# ==================== ХРАНИЛИЩЕ ПРОДУКЦИИ ====================
+
+def make_product(product_id):
+    """Синтетическая продукция с уникальным артикулом"""
+    return {
+        "id": product_id,
+        "article": f"ART-{product_id:07d}",
+        "name": f"Изделие {product_id}",
+        "product_type_id": product_id % 4 + 1,
+        "material": "Дуб натуральный",
+        "min_price": 1000 + product_id % 5000,
+        "param1": 1.5,
+        "param2": 0.8
+    }
+
+
+def time_per_op(func, keys):
+    """Среднее время одной операции (в микросекундах) по набору ключей"""
+    started = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - started) / len(keys) * 1e6
+
+
+def benchmark_product_store(count, operations):
+    """Время операций ProductStore на большом каталоге в сравнении со списком словарей"""
+    print(f"📊 ProductStore: {count} продуктов, {operations} операций на замер")
+
+    started = time.perf_counter()
+    store = furniture_app.ProductStore(make_product(i) for i in range(1, count + 1))
+    print(f"   📌 Загрузка: {time.perf_counter() - started:.2f} с")
+
+    rng = np.random.default_rng(42)
+    ids = [int(i) for i in rng.integers(1, count + 1, operations)]
+    articles = [f"ART-{i:07d}" for i in ids]
+
+    results = {
+        'get': time_per_op(store.get, ids),
+        'get_by_article': time_per_op(store.get_by_article, articles),
+        'update': time_per_op(lambda i: store.update(i, min_price=i), ids),
+        'delete': time_per_op(store.delete, ids),
+        'add': time_per_op(lambda i: store.add(make_product(count + i)), range(1, operations + 1)),
+        'snapshot (без изменений)': time_per_op(lambda _: store.snapshot(), range(operations))
+    }
+
+    # Прежний вариант: удаление пересобирает список целиком
+    plain = [make_product(i) for i in range(1, count + 1)]
+    victims = ids[:max(1, operations // 100)]
+
+    def list_delete(product_id):
+        nonlocal plain
+        plain = [p for p in plain if p["id"] != product_id]
+
+    results['delete (список)'] = time_per_op(list_delete, victims)
+    results['get (поиск в списке)'] = time_per_op(
+        lambda i: next((p for p in plain if p["id"] == i), None), victims
+    )
+
+    for operation, micros in results.items():
+        print(f"   📄 {operation:<26} {micros:14.2f} мкс/оп")
+
+    return results
+
+
+def benchmark_persistence(count, writers, mutations):
+    """Холодный старт со снимком на count продуктов и пропускная способность группового fsync"""
+    print(f"📊 Сохранение продукции: {count} продуктов, {writers} потоков по {mutations} изменений")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        snapshot_path = os.path.join(data_dir, furniture_app.SNAPSHOT_FILE)
+        records = [furniture_app.ProductRecord.from_dict(make_product(i)) for i in range(1, count + 1)]
+
+        started = time.perf_counter()
+        furniture_app.write_snapshot(snapshot_path, records, count + 1)
+        print(f"   📌 Запись снимка: {time.perf_counter() - started:.3f} с, "
+              f"{os.path.getsize(snapshot_path) / 1024 / 1024:.1f} MB")
+        del records
+
+        started = time.perf_counter()
+        next_id, seq, rows = furniture_app.read_snapshot(snapshot_path)
+        read_time = time.perf_counter() - started
+        started = time.perf_counter()
+        store = furniture_app.open_product_store(data_dir)
+        print(f"   📌 Чтение снимка через mmap: {read_time * 1000:.0f} мс, "
+              f"холодный старт целиком: {(time.perf_counter() - started) * 1000:.0f} мс")
+        del rows
+
+        def write(worker):
+            for i in range(mutations):
+                store.update(worker * mutations + i + 1, min_price=i)
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(writers)]
+        log = store._log
+        groups_before = log.groups
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        groups = log.groups - groups_before
+        total = writers * mutations
+        print(f"   📄 Изменений с fsync: {total / elapsed:10.0f} в секунду, "
+              f"групп: {groups}, в среднем {total / max(groups, 1):.1f} изменений на fsync")
+
+        started = time.perf_counter()
+        store.compact(snapshot_path)
+        print(f"   📌 Сжатие журнала в снимок: {time.perf_counter() - started:.3f} с")
+
+    return True
+
+
+# ==================== РАСЧЕТ СЫРЬЯ ====================
+
+def legacy_calculate_raw_materials(product_type_id, material_type_id, quantity, param1, param2):
+    """Прежняя реализация: линейный поиск по справочникам на каждый вызов"""
+    product_type = next((pt for pt in furniture_app.PRODUCT_TYPES if pt["id"] == product_type_id), None)
+    if not product_type:
+        return -1
+
+    material_type = next((mt for mt in furniture_app.MATERIAL_TYPES if mt["id"] == material_type_id), None)
+    if not material_type:
+        return -1
+
+    if quantity <= 0 or param1 <= 0 or param2 <= 0:
+        return -1
+
+    raw_material_per_unit = param1 * param2 * product_type["coefficient"]
+    total_raw_material = raw_material_per_unit * quantity
+    waste_multiplier = 1 + (material_type["waste_percent"] / 100)
+    return int(total_raw_material * waste_multiplier + 0.5)
+
+
+def make_quote_requests(calls, distinct):
+    """Набор запросов на расчет: distinct различных комбинаций, повторяющихся по кругу"""
+    rng = np.random.default_rng(42)
+    combos = list(zip(
+        rng.integers(0, 6, distinct).tolist(),
+        rng.integers(0, 6, distinct).tolist(),
+        rng.integers(-1, 100, distinct).tolist(),
+        np.round(rng.uniform(-0.5, 5, distinct), 2).tolist(),
+        np.round(rng.uniform(-0.5, 5, distinct), 2).tolist()
+    ))
+    return [combos[i % distinct] for i in range(calls)]
+
+
+def benchmark_raw_materials(calls, distinct):
+    """Задержка одного вызова calculate_raw_materials до и после индексирования справочников"""
+    print(f"📊 calculate_raw_materials: {calls} вызовов, {distinct} различных запросов")
+
+    requests = make_quote_requests(calls, distinct)
+    mismatches = sum(
+        legacy_calculate_raw_materials(*args) != furniture_app.calculate_raw_materials(*args)
+        for args in requests[:distinct]
+    )
+    print(f"   {'✅' if not mismatches else '❌'} Расхождений с прежней реализацией: {mismatches}")
+
+    furniture_app.cached_raw_materials.cache_clear()
+    results = {
+        'линейный поиск (прежний)': time_per_op(lambda args: legacy_calculate_raw_materials(*args), requests),
+        'словари по id': time_per_op(lambda args: furniture_app.compute_raw_materials(*args), requests),
+        'словари по id + кэш': time_per_op(lambda args: furniture_app.calculate_raw_materials(*args), requests)
+    }
+
+    baseline = results['линейный поиск (прежний)']
+    for variant, micros in results.items():
+        print(f"   📄 {variant:<26} {micros * 1000:10.0f} нс/вызов  x{baseline / micros:.1f}")
+
+    info = furniture_app.cached_raw_materials.cache_info()
+    print(f"   📌 Кэш котировок: попаданий {info.hits}, промахов {info.misses}, размер {info.currsize}/{info.maxsize}")
+
+    return results
+
+
+def make_quote_frame(rows, seed):
+    """Случайные запросы на расчет, включая несуществующие id, нецелые id и неположительные размеры"""
+    rng = np.random.default_rng(seed)
+    product_type_ids = rng.integers(-1, 7, rows).astype(float)
+    product_type_ids[rng.random(rows) < 0.05] += 0.5
+    return pd.DataFrame({
+        'product_type_id': product_type_ids,
+        'material_type_id': rng.integers(-1, 7, rows),
+        'quantity': rng.integers(-2, 10000, rows),
+        'param1': np.round(rng.uniform(-1, 10, rows), rng.integers(0, 6)),
+        'param2': rng.uniform(-1, 10, rows)
+    })
+
+
+def benchmark_raw_materials_batch(rows, repeats):
+    """
+    Пропускная способность calculate_raw_materials_batch в сравнении с циклом по строкам.
+    Совпадение со скалярным расчетом проверяет tests/test_raw_materials.py
+    """
+    print(f"📊 calculate_raw_materials_batch: {rows} строк, лучший из {repeats} запусков")
+
+    frame = make_quote_frame(rows, 42)
+    columns = [frame[column].tolist() for column in frame.columns]
+    scalar_rows = min(rows, 200000)
+
+    scalar = measure(
+        lambda: [furniture_app.compute_raw_materials(*args) for args in zip(*(c[:scalar_rows] for c in columns))],
+        repeats
+    ) * rows / scalar_rows
+    batch = measure(lambda: furniture_app.calculate_raw_materials_batch(frame), repeats)
+
+    print(f"   📄 цикл по строкам   {rows / scalar:14.0f} строк/с (оценка по {scalar_rows} строкам)")
+    print(f"   📄 векторный расчет  {rows / batch:14.0f} строк/с  x{scalar / batch:.1f}")
+
+    return {'scalar': scalar, 'batch': batch}
+
+
+# ==================== ПЛАНИРОВАНИЕ ПРОИЗВОДСТВА ====================
+
+WORKSHOP_TYPES = ['Проектирование', 'Обработка', 'Сушка', 'Сборка']
+
+
+def make_planning_data(products, workshops, seed=42):
+    """Синтетические цехи и маршруты: у каждого продукта от 2 до 6 цехов"""
+    rng = np.random.default_rng(seed)
+    workshop_frame = pd.DataFrame({
+        'workshop_id': np.arange(1, workshops + 1),
+        'workshop_name': [f"Цех {i}" for i in range(1, workshops + 1)],
+        'workshop_type': [WORKSHOP_TYPES[i % len(WORKSHOP_TYPES)] for i in range(workshops)],
+        'staff_count': rng.integers(2, 10, workshops)
+    })
+    route_product_ids = []
+    route_workshop_ids = []
+    for product_id in range(1, products + 1):
+        route = rng.choice(workshops, size=rng.integers(2, 7), replace=False) + 1
+        route_product_ids.extend([product_id] * len(route))
+        route_workshop_ids.extend(route.tolist())
+    routes = pd.DataFrame({
+        'product_id': route_product_ids,
+        'workshop_id': route_workshop_ids,
+        'manufacturing_time_hours': np.round(rng.uniform(0.1, 5, len(route_product_ids)), 1)
+    })
+    return routes, workshop_frame
+
+
+def make_order_book(lines, products, seed=42):
+    """Синтетический портфель заказов"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'product_id': rng.integers(1, products + 1, lines),
+        'quantity': rng.integers(1, 50, lines)
+    })
+
+
+def benchmark_capacity_plan(lines, products, workshops, repeats):
+    """Время расчета загрузки цехов для портфеля заказов"""
+    print(f"📊 plan_capacity: {lines} строк заказов, {products} продуктов, {workshops} цехов, "
+          f"лучший из {repeats} запусков")
+
+    routes, workshop_frame = make_planning_data(products, workshops)
+    orders = make_order_book(lines, products)
+    order_dicts = orders.to_dict(orient='records')
+
+    results = {
+        'DataFrame': measure(lambda: production_planning.plan_capacity(orders, routes, workshop_frame), repeats),
+        'список словарей (как из JSON)': measure(
+            lambda: production_planning.plan_capacity(order_dicts, routes, workshop_frame), repeats
+        )
+    }
+    plan = production_planning.plan_capacity(orders, routes, workshop_frame)
+
+    for variant, elapsed in results.items():
+        print(f"   📄 {variant:<30} {elapsed * 1000:10.1f} мс  {lines / elapsed:12.0f} строк/с")
+    print(f"   📌 Узкие места: {plan['bottlenecks']}, выполнение за {plan['completion_hours']} ч")
+
+    return results
+
+
+def check_capacity_models(routes, workshop_frame, orders, seed=42):
+    """
+    Проверка свойства: для одного заказа в пустых цехах расписание, срок по критическому пути
+    и план загрузки дают одинаковые часы — по каждому цеху и в целом
+    """
+    rng = np.random.default_rng(seed)
+    details = routes.merge(workshop_frame, on='workshop_id')
+    product_ids = rng.choice(routes['product_id'].unique(), orders)
+    models = production_planning.route_models(details[details['product_id'].isin(product_ids)], product_ids.tolist())
+
+    mismatches = 0
+    for product_id in product_ids.tolist():
+        quantity = int(rng.integers(1, 50))
+        order = [{'product_id': product_id, 'quantity': quantity}]
+        schedule = production_planning.schedule_orders(order, routes, workshop_frame)
+        lead_time = production_planning.compute_lead_time(models[product_id], quantity)
+        plan = production_planning.plan_capacity(order, routes, workshop_frame)
+
+        scheduled = {workshop['workshop_id']: workshop['finish_hours'] - workshop['start_hours']
+                     for workshop in schedule['workshops'] if workshop['start_hours'] is not None}
+        planned = {workshop['workshop_id']: workshop['required_hours'] for workshop in plan['workshops']}
+        stage_hours = {workshop['workshop_id']: workshop['stage_hours']
+                       for stage in lead_time['stages'] for workshop in stage['workshops']}
+
+        agree = abs(schedule['makespan_hours'] - lead_time['lead_time_hours']) < 0.01 and all(
+            abs(hours - scheduled[workshop_id]) < 0.01 and abs(hours - planned[workshop_id]) < 0.01
+            for workshop_id, hours in stage_hours.items()
+        )
+        mismatches += not agree
+    print(f"   {'✅' if not mismatches else '❌'} Сверка расписания, срока и плана загрузки: "
+          f"{orders} заказов, расхождений: {mismatches}")
+    return mismatches == 0
+
+
+def benchmark_schedule(order_counts, products, workshops):
+    """Масштабирование планировщика с ограниченной мощностью по числу заказов"""
+    print(f"📊 schedule_orders: {products} продуктов, {workshops} цехов")
+
+    routes, workshop_frame = make_planning_data(products, workshops)
+    matches = check_capacity_models(routes, workshop_frame, 200)
+    results = {}
+    for count in order_counts:
+        orders = make_order_book(count, products, seed=count).to_dict(orient='records')
+        started = time.perf_counter()
+        schedule = production_planning.schedule_orders(orders, routes, workshop_frame)
+        elapsed = time.perf_counter() - started
+        results[count] = elapsed
+        print(f"   📄 {count:>8} заказов {elapsed * 1000:10.1f} мс  {count / elapsed:10.0f} заказов/с  "
+              f"makespan {schedule['makespan_hours']:.1f} ч")
+
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки Premium Furniture Solutions')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    formats_parser = subparsers.add_parser('import-formats', help='Скорость чтения xlsx / csv / parquet')
+    formats_parser.add_argument('--rows', type=int, default=20000)
+    formats_parser.add_argument('--repeats', type=int, default=3)
+
+    store_parser = subparsers.add_parser('product-store', help='Операции ProductStore на большом каталоге')
+    store_parser.add_argument('--products', type=int, default=1000000)
+    store_parser.add_argument('--operations', type=int, default=10000)
+
+    quote_parser = subparsers.add_parser('raw-materials', help='Задержка calculate_raw_materials')
+    quote_parser.add_argument('--calls', type=int, default=200000)
+    quote_parser.add_argument('--distinct', type=int, default=1000)
+
+    batch_parser = subparsers.add_parser('raw-materials-batch', help='Векторный расчет сырья')
+    batch_parser.add_argument('--rows', type=int, default=1000000)
+    batch_parser.add_argument('--repeats', type=int, default=3)
+
+    persistence_parser = subparsers.add_parser('persistence', help='Снимок, журнал и холодный старт')
+    persistence_parser.add_argument('--products', type=int, default=1000000)
+    persistence_parser.add_argument('--writers', type=int, default=8)
+    persistence_parser.add_argument('--mutations', type=int, default=500)
+
+    capacity_parser = subparsers.add_parser('capacity-plan', help='Загрузка цехов портфелем заказов')
+    capacity_parser.add_argument('--lines', type=int, default=100000)
+    capacity_parser.add_argument('--products', type=int, default=5000)
+    capacity_parser.add_argument('--workshops', type=int, default=40)
+    capacity_parser.add_argument('--repeats', type=int, default=3)
+
+    schedule_parser = subparsers.add_parser('schedule', help='Планировщик с ограниченной мощностью цехов')
+    schedule_parser.add_argument('--orders', type=int, nargs='+', default=[1000, 5000, 20000, 50000])
+    schedule_parser.add_argument('--products', type=int, default=5000)
+    schedule_parser.add_argument('--workshops', type=int, default=40)
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'import-formats':
+        benchmark_import_formats(args.rows, args.repeats)
+    elif args.benchmark == 'product-store':
+        benchmark_product_store(args.products, args.operations)
+    elif args.benchmark == 'persistence':
+        benchmark_persistence(args.products, args.writers, args.mutations)
+    elif args.benchmark == 'capacity-plan':
+        benchmark_capacity_plan(args.lines, args.products, args.workshops, args.repeats)
+    elif args.benchmark == 'schedule':
+        return benchmark_schedule(args.orders, args.products, args.workshops)
+    elif args.benchmark == 'raw-materials':
+        benchmark_raw_materials(args.calls, args.distinct)
+    elif args.benchmark == 'raw-materials-batch':
+        benchmark_raw_materials_batch(args.rows, args.repeats)
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
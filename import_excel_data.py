@@ -1,14 +1,26 @@
 #!/usr/bin/env python3
 """
-Скрипт для импорта данных из Excel файлов в базу данных Premium Furniture Solutions
+Скрипт для импорта данных из Excel, CSV и Parquet файлов в базу данных Premium Furniture Solutions
 """
 
 import os
+import io
+import argparse
+import contextlib
+import hashlib
+import json
+import shutil
+import time
+import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2.extras import DictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import sys
-from decimal import Decimal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
 
 # ==================== НАСТРОЙКИ БАЗЫ ДАННЫХ ====================
 DB_CONFIG = {
@@ -20,6 +32,7 @@ DB_CONFIG = {
 }
 
 # ==================== ПУТИ К ФАЙЛАМ ====================
+# Каждый источник может быть .xlsx, .csv или .parquet — формат определяется по расширению
 EXCEL_FILES = {
     'material_types': 'Material_type_import.xlsx',
     'product_types': 'Product_type_import.xlsx',
@@ -28,6 +41,89 @@ EXCEL_FILES = {
     'product_workshops': 'Product_workshops_import.xlsx'
 }
 
+# Листы Excel (для CSV и Parquet не используются)
+EXCEL_SHEETS = {
+    'material_types': 'Material_type_import',
+    'product_types': 'Product_type_import',
+    'workshops': 'Workshops_import',
+    'products': 'Products_import',
+    'product_workshops': 'Product_workshops_import'
+}
+
+# Колонки, которые читаются из каждого источника
+SOURCE_COLUMNS = {
+    'material_types': ['Тип материала', 'Процент потерь сырья'],
+    'product_types': ['Тип продукции', 'Коэффициент типа продукции'],
+    'workshops': ['Название цеха', 'Тип цеха', 'Количество человек для производства'],
+    'products': [
+        'Тип продукции', 'Наименование продукции', 'Артикул',
+        'Минимальная стоимость для партнера', 'Основной материал'
+    ],
+    'product_workshops': ['Наименование продукции', 'Название цеха', 'Время изготовления, ч']
+}
+
+SOURCE_FORMATS = {
+    '.xlsx': 'xlsx',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet'
+}
+
+# Настройки чтения CSV (выгрузки из ERP обычно в UTF-8 с BOM)
+CSV_OPTIONS = {
+    'sep': ',',
+    'encoding': 'utf-8-sig'
+}
+
+# Порядок загрузки таблиц (по зависимостям внешних ключей)
+IMPORT_ORDER = [
+    'material_types',
+    'product_types',
+    'workshops',
+    'products',
+    'product_workshops'
+]
+
+# Зависимости таблиц: таблица загружается после фиксации всех своих родителей
+TABLE_DEPENDENCIES = {
+    'material_types': [],
+    'product_types': [],
+    'workshops': [],
+    'products': ['material_types', 'product_types'],
+    'product_workshops': ['products', 'workshops']
+}
+
+# Параллельная загрузка: по умолчанию три независимых справочника одновременно
+IMPORT_WORKERS = 3
+
+# Естественные ключи строк для дифференциального импорта
+NATURAL_KEYS = {
+    'material_types': ['material_type_name'],
+    'product_types': ['product_type_name'],
+    'workshops': ['workshop_name'],
+    'products': ['product_name'],
+    'product_workshops': ['product_name', 'workshop_name']
+}
+
+# ==================== КОНТРОЛЬНЫЕ ТОЧКИ ====================
+CHECKPOINT_FILE = 'import_checkpoint.json'
+CHECKPOINT_CACHE_DIR = '.import_cache'
+IMPORT_BATCH_SIZE = 1000
+CHECKPOINT_LOCK = threading.Lock()
+
+# ==================== ПРОВЕРКА ДАННЫХ ====================
+VALIDATION_REPORT_FILE = 'import_validation_report.json'
+
+# ==================== РЕЖИМ НАБЛЮДЕНИЯ ====================
+WATCH_STATE_FILE = 'import_watch_state.json'
+WATCH_POLL_SECONDS = 5
+WATCH_DEBOUNCE_SECONDS = 10
+WATCH_LOCK_TIMEOUT = '5s'
+WATCH_NICE_INCREMENT = 10
+
+# Как часто печатать прогресс загрузки
+PROGRESS_INTERVAL_SECONDS = 2.0
+
 def get_db_connection():
     """Создает соединение с базой данных"""
     try:
@@ -39,16 +135,19 @@ def get_db_connection():
         return None
 
 def check_excel_files():
-    """Проверяет наличие всех Excel файлов"""
-    print("🔍 Проверка наличия файлов Excel...")
+    """Проверяет наличие всех файлов-источников (Excel, CSV или Parquet)"""
+    print("🔍 Проверка наличия файлов для импорта...")
     
     missing_files = []
     for file_type, filename in EXCEL_FILES.items():
         if not os.path.exists(filename):
             missing_files.append(filename)
             print(f"   ❌ {filename} - не найден")
+        elif os.path.splitext(filename)[1].lower() not in SOURCE_FORMATS:
+            missing_files.append(filename)
+            print(f"   ❌ {filename} - неподдерживаемый формат")
         else:
-            print(f"   ✅ {filename} - найден")
+            print(f"   ✅ {filename} - найден ({detect_source_format(filename)})")
     
     if missing_files:
         print(f"\n❌ Отсутствуют файлы: {', '.join(missing_files)}")
@@ -58,6 +157,85 @@ def check_excel_files():
     print("✅ Все файлы найдены")
     return True
 
+def detect_source_format(filename):
+    """Определяет формат файла-источника по расширению"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SOURCE_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+    return SOURCE_FORMATS[extension]
+
+def read_source(table, filename=None):
+    """Читает источник данных для таблицы в DataFrame с колонками из SOURCE_COLUMNS"""
+    filename = filename or EXCEL_FILES[table]
+    columns = SOURCE_COLUMNS[table]
+    source_format = detect_source_format(filename)
+    
+    if source_format == 'parquet':
+        # Колоночный формат: читаем только нужные колонки через pyarrow
+        df = pd.read_parquet(filename, columns=columns, engine='pyarrow')
+    elif source_format == 'csv':
+        # Загрузке нужна вся таблица сразу, поэтому CSV читается одним вызовом
+        df = pd.read_csv(filename, usecols=columns, **CSV_OPTIONS)
+    else:
+        df = pd.read_excel(
+            filename,
+            sheet_name=EXCEL_SHEETS[table],
+            usecols=columns
+        )
+    
+    return df[columns]
+
+CENTS = Decimal('0.01')
+
+def decimal_value(value, scale=1):
+    """
+    Значение для колонки DECIMAL(…, 2): Decimal(str(x)) × scale с округлением до сотых
+    половиной от нуля — так же, как округляет numeric в PostgreSQL
+    """
+    return (Decimal(str(value)) * scale).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+def decimal_column(values, scale=1):
+    """Колонка DECIMAL(…, 2) как float, округленная по правилам decimal_value"""
+    return values.map(lambda value: float(decimal_value(value, scale))).astype(float)
+
+def normalize_source(table, df):
+    """
+    Приводит DataFrame источника к колонкам таблицы БД.
+    Ссылки на справочники остаются именами — ID подставляются при загрузке.
+    """
+    if table == 'material_types':
+        # В Excel проценты указаны как 0.008 (0.8%), преобразуем в проценты
+        return pd.DataFrame({
+            'material_type_name': df['Тип материала'],
+            'raw_material_loss_percent': decimal_column(df['Процент потерь сырья'], 100)
+        })
+    if table == 'product_types':
+        return pd.DataFrame({
+            'product_type_name': df['Тип продукции'],
+            'product_type_coefficient': decimal_column(df['Коэффициент типа продукции'])
+        })
+    if table == 'workshops':
+        return pd.DataFrame({
+            'workshop_name': df['Название цеха'],
+            'workshop_type': df['Тип цеха'],
+            'staff_count': df['Количество человек для производства'].astype('int64')
+        })
+    if table == 'products':
+        return pd.DataFrame({
+            'product_type_name': df['Тип продукции'],
+            'product_name': df['Наименование продукции'],
+            'article_number': df['Артикул'].astype('int64'),
+            'minimum_partner_price': decimal_column(df['Минимальная стоимость для партнера']),
+            'material_type_name': df['Основной материал']
+        })
+    if table == 'product_workshops':
+        return pd.DataFrame({
+            'product_name': df['Наименование продукции'],
+            'workshop_name': df['Название цеха'],
+            'manufacturing_time_hours': decimal_column(df['Время изготовления, ч'])
+        })
+    raise ValueError(f"Неизвестная таблица: {table}")
+
 def clear_existing_data(cursor):
     """Очищает существующие данные в таблицах"""
     print("\n🧹 Очистка существующих данных...")
@@ -70,7 +248,11 @@ def clear_existing_data(cursor):
         'products', 
         'product_types',
         'material_types',
-        'workshops'
+        'workshops',
+        'import_row_hashes',
+        # Триггеры агрегатов в режиме replica не срабатывают — очищаем явно
+        'product_route_stats',
+        'workshop_route_stats'
     ]
     
     for table in tables:
@@ -82,39 +264,42 @@ def clear_existing_data(cursor):
     
     # Включаем constraints обратно
     cursor.execute("SET session_replication_role = 'origin';")
+    
+    # Триггер версии каталога тоже не сработал: кэш фасетов приложения должен устареть
+    cursor.execute(
+        "UPDATE catalog_versions SET version = nextval('catalog_version_seq') WHERE catalog_name = 'products'"
+    )
 
-def import_material_types(cursor):
+def import_material_types(cursor, checkpoint, df):
     """Импорт типов материалов"""
     print("\n📦 Импорт типов материалов...")
     
+    if is_table_done(checkpoint, 'material_types'):
+        print("   ⏭️  Уже импортированы (контрольная точка)")
+        return True
+    
     try:
-        df = pd.read_excel(
-            EXCEL_FILES['material_types'],
-            sheet_name='Material_type_import'
-        )
-        
-        print(f"   📄 Прочитано записей: {len(df)}")
+        print(f"   📄 Записей к загрузке: {len(df)}")
+        progress = ProgressReporter('material_types', len(df))
         
         for index, row in df.iterrows():
             material_name = row['Тип материала']
-            loss_percent = Decimal(str(row['Процент потерь сырья']))
-            
             # В Excel проценты указаны как 0.008 (0.8%), преобразуем в проценты
-            loss_percent_percent = loss_percent * 100  # 0.008 → 0.8
+            loss_percent_percent = decimal_value(row['Процент потерь сырья'], 100)  # 0.008 → 0.8
             
             cursor.execute(
                 """
                 INSERT INTO material_types 
                 (material_type_name, raw_material_loss_percent)
                 VALUES (%s, %s)
-                RETURNING material_type_id
                 """,
                 (material_name, loss_percent_percent)
             )
             
-            material_id = cursor.fetchone()[0]
-            print(f"   ✅ {material_name} (ID: {material_id}) - импортирован")
-            
+            progress.advance()
+        
+        mark_table_done(cursor, checkpoint, 'material_types', len(df))
+        progress.finish()
         print(f"✅ Импортировано типов материалов: {len(df)}")
         return True
         
@@ -122,35 +307,35 @@ def import_material_types(cursor):
         print(f"❌ Ошибка импорта типов материалов: {e}")
         return False
 
-def import_product_types(cursor):
+def import_product_types(cursor, checkpoint, df):
     """Импорт типов продукции"""
     print("\n📦 Импорт типов продукции...")
     
+    if is_table_done(checkpoint, 'product_types'):
+        print("   ⏭️  Уже импортированы (контрольная точка)")
+        return True
+    
     try:
-        df = pd.read_excel(
-            EXCEL_FILES['product_types'],
-            sheet_name='Product_type_import'
-        )
-        
-        print(f"   📄 Прочитано записей: {len(df)}")
+        print(f"   📄 Записей к загрузке: {len(df)}")
+        progress = ProgressReporter('product_types', len(df))
         
         for index, row in df.iterrows():
             product_type_name = row['Тип продукции']
-            coefficient = Decimal(str(row['Коэффициент типа продукции']))
+            coefficient = decimal_value(row['Коэффициент типа продукции'])
             
             cursor.execute(
                 """
                 INSERT INTO product_types 
                 (product_type_name, product_type_coefficient)
                 VALUES (%s, %s)
-                RETURNING product_type_id
                 """,
                 (product_type_name, coefficient)
             )
             
-            product_type_id = cursor.fetchone()[0]
-            print(f"   ✅ {product_type_name} (ID: {product_type_id}, коэффициент: {coefficient}) - импортирован")
-            
+            progress.advance()
+        
+        mark_table_done(cursor, checkpoint, 'product_types', len(df))
+        progress.finish()
         print(f"✅ Импортировано типов продукции: {len(df)}")
         return True
         
@@ -158,17 +343,17 @@ def import_product_types(cursor):
         print(f"❌ Ошибка импорта типов продукции: {e}")
         return False
 
-def import_workshops(cursor):
+def import_workshops(cursor, checkpoint, df):
     """Импорт цехов"""
     print("\n🏭 Импорт цехов...")
     
+    if is_table_done(checkpoint, 'workshops'):
+        print("   ⏭️  Уже импортированы (контрольная точка)")
+        return True
+    
     try:
-        df = pd.read_excel(
-            EXCEL_FILES['workshops'],
-            sheet_name='Workshops_import'
-        )
-        
-        print(f"   📄 Прочитано записей: {len(df)}")
+        print(f"   📄 Записей к загрузке: {len(df)}")
+        progress = ProgressReporter('workshops', len(df))
         
         for index, row in df.iterrows():
             workshop_name = row['Название цеха']
@@ -180,14 +365,14 @@ def import_workshops(cursor):
                 INSERT INTO workshops 
                 (workshop_name, workshop_type, staff_count)
                 VALUES (%s, %s, %s)
-                RETURNING workshop_id
                 """,
                 (workshop_name, workshop_type, staff_count)
             )
             
-            workshop_id = cursor.fetchone()[0]
-            print(f"   ✅ {workshop_name} (ID: {workshop_id}, сотрудников: {staff_count}) - импортирован")
-            
+            progress.advance()
+        
+        mark_table_done(cursor, checkpoint, 'workshops', len(df))
+        progress.finish()
         print(f"✅ Импортировано цехов: {len(df)}")
         return True
         
@@ -195,68 +380,41 @@ def import_workshops(cursor):
         print(f"❌ Ошибка импорта цехов: {e}")
         return False
 
-def import_products(cursor):
-    """Импорт продукции"""
+def import_products(cursor, checkpoint, df):
+    """Импорт продукции пакетами с фиксацией каждого пакета"""
     print("\n📦 Импорт продукции...")
     
+    if is_table_done(checkpoint, 'products'):
+        print("   ⏭️  Уже импортирована (контрольная точка)")
+        return True
+    
     try:
-        df = pd.read_excel(
-            EXCEL_FILES['products'],
-            sheet_name='Products_import'
-        )
+        print(f"   📄 Записей к загрузке: {len(df)}")
         
-        print(f"   📄 Прочитано записей: {len(df)}")
+        # Справочники загружаются один раз, а не запросом на каждую строку
+        id_maps = {
+            'product_types': fetch_id_map(cursor, 'product_types'),
+            'material_types': fetch_id_map(cursor, 'material_types')
+        }
         
-        imported_count = 0
-        
-        for index, row in df.iterrows():
-            product_type_name = row['Тип продукции']
-            product_name = row['Наименование продукции']
-            article_number = int(row['Артикул'])
-            min_price = Decimal(str(row['Минимальная стоимость для партнера']))
-            material_name = row['Основной материал']
-            
-            # Получаем ID типа продукции
-            cursor.execute(
-                "SELECT product_type_id FROM product_types WHERE product_type_name = %s",
-                (product_type_name,)
-            )
-            product_type_result = cursor.fetchone()
-            
-            if not product_type_result:
-                print(f"   ⚠️  Пропущен {product_name}: тип продукции '{product_type_name}' не найден")
-                continue
-            
-            product_type_id = product_type_result[0]
-            
-            # Получаем ID материала
-            cursor.execute(
-                "SELECT material_type_id FROM material_types WHERE material_type_name = %s",
-                (material_name,)
-            )
-            material_result = cursor.fetchone()
-            
-            if not material_result:
-                print(f"   ⚠️  Пропущен {product_name}: материал '{material_name}' не найден")
-                continue
-            
-            material_type_id = material_result[0]
-            
-            # Вставляем продукт
-            cursor.execute(
-                """
-                INSERT INTO products 
-                (product_type_id, product_name, article_number, minimum_partner_price, material_type_id)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING product_id
-                """,
-                (product_type_id, product_name, article_number, min_price, material_type_id)
+        def load_batch(batch):
+            rows = normalize_source('products', batch).drop_duplicates(
+                subset=['product_name'], keep='last'
             )
+            resolved, found = resolve_foreign_keys(cursor, 'products', rows, id_maps)
             
-            product_id = cursor.fetchone()[0]
-            imported_count += 1
-            print(f"   ✅ {product_name} (ID: {product_id}, артикул: {article_number}) - импортирован")
+            for _, row in rows[~found].iterrows():
+                if row['product_type_name'] not in id_maps['product_types']:
+                    print(f"   ⚠️  Пропущен {row['product_name']}: тип продукции '{row['product_type_name']}' не найден")
+                else:
+                    print(f"   ⚠️  Пропущен {row['product_name']}: материал '{row['material_type_name']}' не найден")
             
+            if len(resolved) > 0:
+                execute_values(cursor, UPSERT_QUERIES['products'], dataframe_rows(resolved), page_size=1000)
+            return len(resolved)
+        
+        imported_count = run_checkpointed_batches(cursor, 'products', df, load_batch, checkpoint)
+        
         print(f"✅ Импортировано продуктов: {imported_count}/{len(df)}")
         return imported_count > 0
         
@@ -264,95 +422,46 @@ def import_products(cursor):
         print(f"❌ Ошибка импорта продукции: {e}")
         return False
 
-def import_product_workshops(cursor):
-    """Импорт связей продукции с цехами"""
+def import_product_workshops(cursor, checkpoint, df):
+    """Импорт связей продукции с цехами пакетами с фиксацией каждого пакета"""
     print("\n🔗 Импорт связей продукции с цехами...")
     
+    if is_table_done(checkpoint, 'product_workshops'):
+        print("   ⏭️  Уже импортированы (контрольная точка)")
+        return True
+    
     try:
-        df = pd.read_excel(
-            EXCEL_FILES['product_workshops'],
-            sheet_name='Product_workshops_import'
-        )
+        print(f"   📄 Записей к загрузке: {len(df)}")
         
-        print(f"   📄 Прочитано записей: {len(df)}")
+        id_maps = {
+            'products': fetch_id_map(cursor, 'products'),
+            'workshops': fetch_id_map(cursor, 'workshops')
+        }
         
-        imported_count = 0
-        skipped_count = 0
-        
-        for index, row in df.iterrows():
-            product_name = row['Наименование продукции']
-            workshop_name = row['Название цеха']
-            manufacturing_time = Decimal(str(row['Время изготовления, ч']))
-            
-            # Получаем ID продукта
-            cursor.execute(
-                "SELECT product_id FROM products WHERE product_name = %s",
-                (product_name,)
-            )
-            product_result = cursor.fetchone()
-            
-            if not product_result:
-                print(f"   ⚠️  Пропущена связь: продукт '{product_name}' не найден")
-                skipped_count += 1
-                continue
-            
-            product_id = product_result[0]
-            
-            # Получаем ID цеха
-            cursor.execute(
-                "SELECT workshop_id FROM workshops WHERE workshop_name = %s",
-                (workshop_name,)
+        def load_batch(batch):
+            # Повтор пары продукт/цех внутри пакета: побеждает последняя строка, как и раньше
+            rows = normalize_source('product_workshops', batch).drop_duplicates(
+                subset=['product_name', 'workshop_name'], keep='last'
             )
-            workshop_result = cursor.fetchone()
-            
-            if not workshop_result:
-                print(f"   ⚠️  Пропущена связь: цех '{workshop_name}' не найден")
-                skipped_count += 1
-                continue
+            resolved, found = resolve_foreign_keys(cursor, 'product_workshops', rows, id_maps)
             
-            workshop_id = workshop_result[0]
+            for _, row in rows[~found].iterrows():
+                if row['product_name'] not in id_maps['products']:
+                    print(f"   ⚠️  Пропущена связь: продукт '{row['product_name']}' не найден")
+                else:
+                    print(f"   ⚠️  Пропущена связь: цех '{row['workshop_name']}' не найден")
             
-            # Проверяем, существует ли уже такая связь
-            cursor.execute(
-                """
-                SELECT 1 FROM product_workshops 
-                WHERE product_id = %s AND workshop_id = %s
-                """,
-                (product_id, workshop_id)
-            )
-            
-            if cursor.fetchone():
-                # Обновляем существующую запись
-                cursor.execute(
-                    """
-                    UPDATE product_workshops 
-                    SET manufacturing_time_hours = %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE product_id = %s AND workshop_id = %s
-                    """,
-                    (manufacturing_time, product_id, workshop_id)
-                )
-                action = "обновлена"
-            else:
-                # Вставляем новую запись
-                cursor.execute(
-                    """
-                    INSERT INTO product_workshops 
-                    (product_id, workshop_id, manufacturing_time_hours)
-                    VALUES (%s, %s, %s)
-                    """,
-                    (product_id, workshop_id, manufacturing_time)
-                )
-                action = "добавлена"
-            
-            imported_count += 1
-            
-            if imported_count % 20 == 0:  # Выводим прогресс каждые 20 записей
-                print(f"   📊 Обработано: {imported_count} связей")
+            # Существующие связи обновляются, новые добавляются
+            if len(resolved) > 0:
+                execute_values(cursor, UPSERT_QUERIES['product_workshops'], dataframe_rows(resolved), page_size=1000)
+            return len(resolved)
+        
+        imported_count = run_checkpointed_batches(cursor, 'product_workshops', df, load_batch, checkpoint)
+        skipped_count = len(df) - imported_count
         
         print(f"✅ Импортировано связей: {imported_count}")
         if skipped_count > 0:
-            print(f"⚠️  Пропущено связей: {skipped_count} (продукты/цехи не найдены)")
+            print(f"⚠️  Пропущено связей: {skipped_count} (продукты/цехи не найдены или повторяются)")
         
         return imported_count > 0
         
@@ -360,35 +469,256 @@ def import_product_workshops(cursor):
         print(f"❌ Ошибка импорта связей: {e}")
         return False
 
-def verify_import(cursor):
-    """Проверка результатов импорта"""
+# ==================== КОНТРОЛЬНЫЕ ТОЧКИ ИМПОРТА ====================
+
+def file_checksum(filename):
+    """Считает SHA-256 файла-источника"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def new_checkpoint():
+    """Создает контрольную точку для нового импорта"""
+    return {
+        'tables': {
+            table: {
+                'source': EXCEL_FILES[table],
+                'checksum': file_checksum(EXCEL_FILES[table]),
+                'rows_done': 0,
+                'rows_loaded': 0,
+                'done': False
+            }
+            for table in IMPORT_ORDER
+        }
+    }
+
+def save_checkpoint(checkpoint):
+    """Атомарно сохраняет контрольную точку на диск (таблицы могут грузиться параллельно)"""
+    with CHECKPOINT_LOCK:
+        tmp_file = CHECKPOINT_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CHECKPOINT_FILE)
+
+def load_checkpoint():
+    """
+    Загружает контрольную точку прерванного импорта.
+    Возвращает None, если продолжать нечего или источники изменились.
+    """
+    if not os.path.exists(CHECKPOINT_FILE):
+        print("❌ Контрольная точка не найдена — нечего продолжать")
+        return None
+    
+    with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    
+    for table, state in checkpoint['tables'].items():
+        if state['done']:
+            continue
+        if state['source'] != EXCEL_FILES[table] or state['checksum'] != file_checksum(EXCEL_FILES[table]):
+            print(f"❌ Источник {EXCEL_FILES[table]} изменился после прерванного импорта")
+            print("📌 Запустите полный импорт без --resume")
+            return None
+    
+    return checkpoint
+
+def clear_checkpoint():
+    """Удаляет контрольную точку и кэш разобранных источников после успешного импорта"""
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    shutil.rmtree(CHECKPOINT_CACHE_DIR, ignore_errors=True)
+
+def is_table_done(checkpoint, table):
+    return checkpoint['tables'][table]['done']
+
+def mark_table_done(cursor, checkpoint, table, rows_loaded):
+    """Фиксирует таблицу целиком и отмечает ее в контрольной точке"""
+    cursor.connection.commit()
+    state = checkpoint['tables'][table]
+    state.update({'rows_done': rows_loaded, 'rows_loaded': rows_loaded, 'done': True})
+    save_checkpoint(checkpoint)
+
+def load_source(table, checkpoint):
+    """
+    Читает источник, сохраняя разобранный DataFrame в кэш по контрольной сумме файла,
+    чтобы продолжение импорта не разбирало файл повторно
+    """
+    state = checkpoint['tables'][table]
+    cache_file = os.path.join(CHECKPOINT_CACHE_DIR, f"{table}-{state['checksum'][:16]}.pkl")
+    
+    if os.path.exists(cache_file):
+        print("   ♻️  Используется разобранный ранее источник")
+        df = pd.read_pickle(cache_file)
+    else:
+        df = read_source(table)
+        os.makedirs(CHECKPOINT_CACHE_DIR, exist_ok=True)
+        df.to_pickle(cache_file)
+    
+    return df
+
+def run_checkpointed_batches(cursor, table, df, load_batch, checkpoint):
+    """
+    Загружает DataFrame пакетами по IMPORT_BATCH_SIZE строк.
+    После каждого пакета транзакция фиксируется, а прогресс записывается в контрольную точку;
+    уже зафиксированные пакеты при продолжении пропускаются.
+    """
+    state = checkpoint['tables'][table]
+    start = state['rows_done']
+    
+    if start > 0:
+        print(f"   ⏩ Продолжение с записи {start} (загружено ранее: {state['rows_loaded']})")
+    
+    progress = ProgressReporter(table, len(df), start=start)
+    for offset in range(start, len(df), IMPORT_BATCH_SIZE):
+        batch = df.iloc[offset:offset + IMPORT_BATCH_SIZE]
+        loaded = load_batch(batch)
+        cursor.connection.commit()
+        
+        state['rows_done'] = offset + len(batch)
+        state['rows_loaded'] += loaded
+        save_checkpoint(checkpoint)
+        progress.advance(len(batch))
+    
+    state['done'] = True
+    save_checkpoint(checkpoint)
+    progress.finish()
+    return state['rows_loaded']
+
+# ==================== ПРОВЕРКА ПО КОНТРОЛЬНЫМ СУММАМ ====================
+# Колонки, по которым считается содержимое строки. Ссылки на справочники
+# сравниваются по именам, чтобы результат не зависел от выданных ID.
+CHECKSUM_COLUMNS = {
+    'material_types': ['material_type_name', 'raw_material_loss_percent'],
+    'product_types': ['product_type_name', 'product_type_coefficient'],
+    'workshops': ['workshop_name', 'workshop_type', 'staff_count'],
+    'products': ['product_type_name', 'product_name', 'article_number',
+                 'minimum_partner_price', 'material_type_name'],
+    'product_workshops': ['product_name', 'workshop_name', 'manufacturing_time_hours']
+}
+
+CHECKSUM_DECIMAL_COLUMNS = {
+    'raw_material_loss_percent', 'product_type_coefficient',
+    'minimum_partner_price', 'manufacturing_time_hours'
+}
+
+CHECKSUM_SEPARATOR = chr(31)
+
+# Хеш строки: первые 8 байт md5 как знаковый bigint. Сумма хешей не зависит от порядка строк.
+ROW_CHECKSUM_SQL = "('x' || left(md5(concat_ws(chr(31), {columns})), 16))::bit(64)::bigint"
+
+CHECKSUM_SOURCES = {
+    'material_types': "FROM material_types t",
+    'product_types': "FROM product_types t",
+    'workshops': "FROM workshops t",
+    'products': """FROM products t
+        JOIN product_types pt ON pt.product_type_id = t.product_type_id
+        JOIN material_types mt ON mt.material_type_id = t.material_type_id""",
+    'product_workshops': """FROM product_workshops t
+        JOIN products p ON p.product_id = t.product_id
+        JOIN workshops w ON w.workshop_id = t.workshop_id"""
+}
+
+CHECKSUM_JOINED_COLUMNS = {
+    'products': {
+        'product_type_name': 'pt.product_type_name',
+        'material_type_name': 'mt.material_type_name'
+    },
+    'product_workshops': {
+        'product_name': 'p.product_name',
+        'workshop_name': 'w.workshop_name'
+    }
+}
+
+def build_verify_query():
+    """Собирает один запрос, возвращающий число строк и контрольную сумму каждой таблицы"""
+    parts = []
+    for table in IMPORT_ORDER:
+        joined = CHECKSUM_JOINED_COLUMNS.get(table, {})
+        columns = []
+        for column in CHECKSUM_COLUMNS[table]:
+            if column in joined:
+                columns.append(joined[column])
+            elif column in CHECKSUM_DECIMAL_COLUMNS:
+                columns.append(f"t.{column}::numeric(14,2)")
+            else:
+                columns.append(f"t.{column}")
+        row_checksum = ROW_CHECKSUM_SQL.format(columns=', '.join(columns))
+        parts.append(
+            f"SELECT '{table}' AS table_name, COUNT(*), COALESCE(SUM({row_checksum}), 0) "
+            f"{CHECKSUM_SOURCES[table]}"
+        )
+    return "\nUNION ALL\n".join(parts)
+
+VERIFY_QUERY = build_verify_query()
+
+def checksum_value(column, value):
+    """Текстовое представление значения так, как его выводит PostgreSQL"""
+    if column in CHECKSUM_DECIMAL_COLUMNS:
+        return str(decimal_value(value))
+    if column in ('staff_count', 'article_number'):
+        return str(int(value))
+    return str(value)
+
+def frame_checksum(table, df):
+    """Число строк и контрольная сумма источника, совместимые с VERIFY_QUERY"""
+    normalized = normalize_source(table, df).drop_duplicates()
+    columns = CHECKSUM_COLUMNS[table]
+    total = 0
+    for row in normalized[columns].itertuples(index=False, name=None):
+        text = CHECKSUM_SEPARATOR.join(checksum_value(column, value) for column, value in zip(columns, row))
+        total += int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'big', signed=True)
+    return len(normalized), total
+
+def verify_import(cursor, frames=None):
+    """
+    Проверка результатов импорта: число строк и контрольные суммы всех таблиц
+    считаются одним запросом и сравниваются с исходными DataFrame.
+    Возвращает общее число записей или None, если данные расходятся с источниками.
+    """
     print("\n🔍 Проверка результатов импорта...")
     
-    queries = {
-        'Типы материалов': "SELECT COUNT(*) FROM material_types",
-        'Типы продукции': "SELECT COUNT(*) FROM product_types",
-        'Цехи': "SELECT COUNT(*) FROM workshops",
-        'Продукция': "SELECT COUNT(*) FROM products",
-        'Связи продукции с цехами': "SELECT COUNT(*) FROM product_workshops"
+    entities = {
+        'material_types': 'Типы материалов',
+        'product_types': 'Типы продукции',
+        'workshops': 'Цехи',
+        'products': 'Продукция',
+        'product_workshops': 'Связи продукции с цехами'
     }
     
+    started = time.perf_counter()
+    cursor.execute(VERIFY_QUERY)
+    database = {row[0]: (row[1], int(row[2])) for row in cursor.fetchall()}
+    
     total_records = 0
+    mismatched = []
     
-    for entity, query in queries.items():
-        cursor.execute(query)
-        count = cursor.fetchone()[0]
+    for table in IMPORT_ORDER:
+        count, checksum = database[table]
         total_records += count
-        print(f"   📊 {entity}: {count} записей")
+        if frames is None or table not in frames:
+            print(f"   📊 {entities[table]}: {count} записей")
+            continue
+        
+        source_count, source_checksum = frame_checksum(table, frames[table])
+        if (count, checksum) == (source_count, source_checksum):
+            print(f"   ✅ {entities[table]}: {count} записей, контрольная сумма совпадает")
+        else:
+            mismatched.append(table)
+            print(f"   ❌ {entities[table]}: в БД {count} записей, в источнике {source_count}, "
+                  f"контрольные суммы {'совпадают' if checksum == source_checksum else 'различаются'}")
     
-    # Выводим статистику по цехам
+    print(f"   ⏱️  Проверка заняла {time.perf_counter() - started:.3f} с")
+    
+    # Выводим статистику по цехам (агрегаты поддерживаются триггерами)
     cursor.execute("""
         SELECT 
             w.workshop_name,
-            COUNT(pw.product_workshop_id) as product_count,
-            SUM(pw.manufacturing_time_hours) as total_hours
+            COALESCE(s.products_count, 0) as product_count,
+            s.total_time_hours as total_hours
         FROM workshops w
-        LEFT JOIN product_workshops pw ON w.workshop_id = pw.workshop_id
-        GROUP BY w.workshop_id, w.workshop_name
+        LEFT JOIN workshop_route_stats s ON w.workshop_id = s.workshop_id
         ORDER BY product_count DESC
     """)
     
@@ -414,154 +744,1450 @@ def verify_import(cursor):
     for stat in product_stats:
         print(f"   📌 {stat[0]}: {stat[1]} продуктов, средняя цена: {float(stat[2] or 0):.2f}₽")
     
+    if mismatched:
+        print(f"\n⚠️  Данные не совпадают с источниками: {', '.join(mismatched)}")
+        return None
+    
     return total_records
 
-def create_excel_import_function(cursor):
-    """Создает функцию для повторного импорта данных"""
-    print("\n⚙️  Создание функции для импорта из Excel...")
+# ==================== ПРОГРЕСС И МЕТРИКИ ИМПОРТА ====================
+
+class ProgressReporter:
+    """
+    Прогресс одного этапа: не чаще раза в PROGRESS_INTERVAL_SECONDS печатает
+    обработанные строки, скорость (строк/с) и оценку оставшегося времени
+    """
+    
+    def __init__(self, stage, total, start=0, interval=PROGRESS_INTERVAL_SECONDS):
+        self.stage = stage
+        self.total = total
+        self.start = start
+        self.done = start
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+    
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return (self.done - self.start) / elapsed if elapsed > 0 else 0.0
+    
+    def advance(self, rows=1):
+        self.done += rows
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval and self.done < self.total:
+            self.last_report = now
+            rate = self.rate()
+            eta = (self.total - self.done) / rate if rate > 0 else float('inf')
+            percent = self.done / self.total * 100 if self.total else 100.0
+            print(f"   ⏳ {self.stage}: {self.done}/{self.total} ({percent:.1f}%) · "
+                  f"{rate:.0f} строк/с · ETA {eta:.0f} с")
+    
+    def finish(self):
+        """Печатает итог этапа и возвращает его метрики"""
+        elapsed = time.perf_counter() - self.started
+        rate = self.rate()
+        print(f"   ✅ {self.stage}: {self.done - self.start} строк за {elapsed:.3f} с ({rate:.0f} строк/с)")
+        return {'rows': self.done - self.start, 'seconds': round(elapsed, 3), 'rows_per_second': round(rate, 1)}
+
+class ImportMetrics:
+    """Собирает метрики импорта в машинно-читаемый документ для мониторинга"""
+    
+    def __init__(self, mode):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.timings = {}
+        self.tables = {table: {} for table in IMPORT_ORDER}
+        self.lock = threading.Lock()
+    
+    def record_stage(self, stage, seconds):
+        with self.lock:
+            self.timings[f'{stage}_seconds'] = round(seconds, 3)
+    
+    def record_table(self, table, **values):
+        with self.lock:
+            self.tables[table].update(values)
+    
+    def to_dict(self, success):
+        for stats in self.tables.values():
+            if stats.get('load_seconds') and 'rows_loaded' in stats:
+                stats['rows_per_second'] = round(stats['rows_loaded'] / stats['load_seconds'], 1)
+        return {
+            'mode': self.mode,
+            'success': bool(success),
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'timings': dict(self.timings, total_seconds=round(time.perf_counter() - self.started, 3)),
+            'tables': self.tables,
+            'rejected_total': sum(stats.get('rejected', 0) for stats in self.tables.values())
+        }
+    
+    def write(self, path, success):
+        """
+        Пишет метрики в файл или в stdout, если путь равен '-'.
+        В этом случае прогресс печатается в stderr (см. main), а документ —
+        в настоящий stdout, чтобы его можно было разобрать.
+        """
+        document = json.dumps(self.to_dict(success), ensure_ascii=False, indent=2)
+        if path == '-':
+            print(document, file=sys.__stdout__, flush=True)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(document)
+            print(f"📈 Метрики импорта записаны в {path}")
+
+# ==================== ПРЕДВАРИТЕЛЬНАЯ ПРОВЕРКА ДАННЫХ ====================
+
+class FrameValidator:
+    """Собирает векторные проверки одного DataFrame и отклоненные строки"""
+    
+    def __init__(self, table, df):
+        self.table = table
+        self.df = df.copy()
+        self.rejected = pd.Series(False, index=df.index)
+        self.errors = []
+    
+    def reject(self, mask, column, code, message):
+        """
+        Отклоняет строки по маске и записывает ошибку для каждой из них.
+        Для строки фиксируется только первая найденная ошибка.
+        """
+        mask = mask.fillna(False).astype(bool) & ~self.rejected
+        if not mask.any():
+            return
+        values = self.df.loc[mask, column]
+        self.errors.append(pd.DataFrame({
+            'table': self.table,
+            # Номер строки в файле: +1 за заголовок, +1 за нумерацию с единицы
+            'row': values.index + 2,
+            'column': column,
+            'value': values.astype(str).values,
+            'error': code,
+            'message': message
+        }))
+        self.rejected |= mask
+    
+    def require(self, columns):
+        """Обязательные колонки не должны быть пустыми"""
+        for column in columns:
+            values = self.df[column]
+            empty = values.isna() | (values.astype(str).str.strip() == '')
+            self.reject(empty, column, 'missing_value', 'Пустое значение')
+    
+    def numeric(self, column, code, message, integer=False):
+        """Приводит колонку к числу; нечисловые значения отклоняются"""
+        values = pd.to_numeric(self.df[column], errors='coerce')
+        invalid = values.isna()
+        if integer:
+            invalid |= (values % 1 != 0)
+        self.reject(invalid, column, code, message)
+        self.df[column] = values
+        return values
+    
+    def positive(self, column, values, code, message):
+        self.reject(values <= 0, column, code, message)
+    
+    def known(self, column, names, code, message):
+        """Ссылка на справочник должна указывать на существующую (прошедшую проверку) запись"""
+        self.reject(~self.df[column].isin(names), column, code, message)
+    
+    def unique(self, columns, code, message):
+        """
+        Повторы отклоняются; как и прежде, побеждает последняя строка.
+        Сравниваются только еще не отклоненные строки: иначе некорректный последний
+        повтор вытеснил бы корректную строку.
+        """
+        valid = self.df[~self.rejected]
+        duplicated = valid.duplicated(subset=columns, keep='last').reindex(self.df.index, fill_value=False)
+        self.reject(duplicated, columns[0], code, message)
+    
+    def result(self):
+        clean = self.df[~self.rejected]
+        errors = pd.concat(self.errors, ignore_index=True) if self.errors else pd.DataFrame()
+        return clean, errors
+
+def validate_sources(frames):
+    """
+    Проверяет все источники векторными операциями pandas до обращения к БД.
+    Возвращает DataFrame только с корректными строками и отчет об ошибках.
+    """
+    clean = {}
+    errors = []
+    
+    for table in IMPORT_ORDER:
+        validator = FrameValidator(table, frames[table])
+        validator.require(SOURCE_COLUMNS[table])
+        
+        if table == 'material_types':
+            loss = validator.numeric('Процент потерь сырья', 'invalid_number', 'Процент потерь не является числом')
+            validator.reject(loss < 0, 'Процент потерь сырья', 'negative_loss', 'Отрицательный процент потерь')
+            validator.unique(['Тип материала'], 'duplicate_material_type', 'Повтор типа материала')
+        
+        elif table == 'product_types':
+            coefficient = validator.numeric('Коэффициент типа продукции', 'invalid_number', 'Коэффициент не является числом')
+            validator.positive('Коэффициент типа продукции', coefficient, 'non_positive_coefficient', 'Коэффициент должен быть положительным')
+            validator.unique(['Тип продукции'], 'duplicate_product_type', 'Повтор типа продукции')
+        
+        elif table == 'workshops':
+            staff = validator.numeric(
+                'Количество человек для производства', 'invalid_staff_count',
+                'Количество сотрудников не является целым числом', integer=True
+            )
+            validator.positive('Количество человек для производства', staff, 'non_positive_staff_count', 'Количество сотрудников должно быть положительным')
+            validator.unique(['Название цеха'], 'duplicate_workshop', 'Повтор цеха')
+        
+        elif table == 'products':
+            validator.numeric('Артикул', 'invalid_article', 'Артикул не является целым числом', integer=True)
+            price = validator.numeric('Минимальная стоимость для партнера', 'invalid_price', 'Цена не является числом')
+            validator.positive('Минимальная стоимость для партнера', price, 'non_positive_price', 'Цена должна быть положительной')
+            validator.known('Тип продукции', clean['product_types']['Тип продукции'], 'unknown_product_type', 'Неизвестный тип продукции')
+            validator.known('Основной материал', clean['material_types']['Тип материала'], 'unknown_material_type', 'Неизвестный материал')
+            validator.unique(['Наименование продукции'], 'duplicate_product', 'Повтор наименования продукции')
+            validator.unique(['Артикул'], 'duplicate_article', 'Повтор артикула')
+        
+        elif table == 'product_workshops':
+            hours = validator.numeric('Время изготовления, ч', 'invalid_time', 'Время изготовления не является числом')
+            validator.positive('Время изготовления, ч', hours, 'non_positive_time', 'Время изготовления должно быть положительным')
+            validator.known('Наименование продукции', clean['products']['Наименование продукции'], 'unknown_product', 'Неизвестный продукт')
+            validator.known('Название цеха', clean['workshops']['Название цеха'], 'unknown_workshop', 'Неизвестный цех')
+            validator.unique(['Наименование продукции', 'Название цеха'], 'duplicate_product_workshop', 'Повтор пары продукт/цех')
+        
+        clean[table], table_errors = validator.result()
+        errors.append(table_errors)
+    
+    errors = pd.concat(errors, ignore_index=True) if any(len(e) for e in errors) else pd.DataFrame()
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'tables': {
+            table: {
+                'source': EXCEL_FILES[table],
+                'rows': len(frames[table]),
+                'valid': len(clean[table]),
+                'rejected': len(frames[table]) - len(clean[table])
+            }
+            for table in IMPORT_ORDER
+        },
+        'errors': errors.to_dict('records') if len(errors) else []
+    }
+    return clean, report
+
+def write_validation_report(report):
+    """Сохраняет отчет проверки в JSON"""
+    with open(VALIDATION_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+def prepare_sources(load, metrics):
+    """
+    Этапы разбора и проверки: читает все источники функцией load(table),
+    отбрасывает некорректные строки и пишет отчет в VALIDATION_REPORT_FILE
+    """
+    print("\n🔎 Разбор и проверка источников...")
+    
+    started = time.perf_counter()
+    frames = {table: load(table) for table in IMPORT_ORDER}
+    parse_time = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    clean_frames, report = validate_sources(frames)
+    validation_time = time.perf_counter() - started
+    
+    report['timings'] = {'parse_seconds': round(parse_time, 3), 'validation_seconds': round(validation_time, 3)}
+    write_validation_report(report)
+    
+    metrics.record_stage('parse', parse_time)
+    metrics.record_stage('validation', validation_time)
+    for table, stats in report['tables'].items():
+        metrics.record_table(table, rows_read=stats['rows'], rows_valid=stats['valid'], rejected=stats['rejected'])
+    
+    for table, stats in report['tables'].items():
+        marker = "✅" if stats['rejected'] == 0 else "⚠️ "
+        print(f"   {marker} {table}: {stats['valid']}/{stats['rows']} корректных, отклонено: {stats['rejected']}")
+    print(f"   ⏱️  Разбор: {parse_time:.3f} с, проверка: {validation_time:.3f} с")
+    if report['errors']:
+        print(f"   📄 Ошибки записаны в {VALIDATION_REPORT_FILE}")
+    
+    return clean_frames, report
+
+# ==================== ДИФФЕРЕНЦИАЛЬНЫЙ ИМПОРТ ====================
+
+# Запросы для выборки естественных ключей и первичных ключей из БД
+EXISTING_KEYS_QUERIES = {
+    'material_types': "SELECT material_type_name, material_type_id FROM material_types",
+    'product_types': "SELECT product_type_name, product_type_id FROM product_types",
+    'workshops': "SELECT workshop_name, workshop_id FROM workshops",
+    'products': "SELECT product_name, product_id FROM products",
+    'product_workshops': """
+        SELECT p.product_name, w.workshop_name, pw.product_workshop_id
+        FROM product_workshops pw
+        JOIN products p ON pw.product_id = p.product_id
+        JOIN workshops w ON pw.workshop_id = w.workshop_id
+    """
+}
+
+PRIMARY_KEYS = {
+    'material_types': 'material_type_id',
+    'product_types': 'product_type_id',
+    'workshops': 'workshop_id',
+    'products': 'product_id',
+    'product_workshops': 'product_workshop_id'
+}
+
+# UPSERT по естественному ключу: первичные ключи существующих строк не меняются,
+# а строки без изменений не перезаписываются
+UPSERT_QUERIES = {
+    'material_types': """
+        INSERT INTO material_types AS t (material_type_name, raw_material_loss_percent)
+        VALUES %s
+        ON CONFLICT (material_type_name) DO UPDATE
+        SET raw_material_loss_percent = EXCLUDED.raw_material_loss_percent,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE t.raw_material_loss_percent IS DISTINCT FROM EXCLUDED.raw_material_loss_percent
+        RETURNING (xmax = 0) AS inserted
+    """,
+    'product_types': """
+        INSERT INTO product_types AS t (product_type_name, product_type_coefficient)
+        VALUES %s
+        ON CONFLICT (product_type_name) DO UPDATE
+        SET product_type_coefficient = EXCLUDED.product_type_coefficient,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE t.product_type_coefficient IS DISTINCT FROM EXCLUDED.product_type_coefficient
+        RETURNING (xmax = 0) AS inserted
+    """,
+    'workshops': """
+        INSERT INTO workshops AS t (workshop_name, workshop_type, staff_count)
+        VALUES %s
+        ON CONFLICT (workshop_name) DO UPDATE
+        SET workshop_type = EXCLUDED.workshop_type,
+            staff_count = EXCLUDED.staff_count,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (t.workshop_type, t.staff_count)
+              IS DISTINCT FROM (EXCLUDED.workshop_type, EXCLUDED.staff_count)
+        RETURNING (xmax = 0) AS inserted
+    """,
+    'products': """
+        INSERT INTO products AS t
+        (product_type_id, product_name, article_number, minimum_partner_price, material_type_id)
+        VALUES %s
+        ON CONFLICT (product_name) DO UPDATE
+        SET product_type_id = EXCLUDED.product_type_id,
+            article_number = EXCLUDED.article_number,
+            minimum_partner_price = EXCLUDED.minimum_partner_price,
+            material_type_id = EXCLUDED.material_type_id,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (t.product_type_id, t.article_number, t.minimum_partner_price, t.material_type_id)
+              IS DISTINCT FROM (EXCLUDED.product_type_id, EXCLUDED.article_number,
+                                EXCLUDED.minimum_partner_price, EXCLUDED.material_type_id)
+        RETURNING (xmax = 0) AS inserted
+    """,
+    'product_workshops': """
+        INSERT INTO product_workshops AS t (product_id, workshop_id, manufacturing_time_hours)
+        VALUES %s
+        ON CONFLICT (product_id, workshop_id) DO UPDATE
+        SET manufacturing_time_hours = EXCLUDED.manufacturing_time_hours,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE t.manufacturing_time_hours IS DISTINCT FROM EXCLUDED.manufacturing_time_hours
+        RETURNING (xmax = 0) AS inserted
+    """
+}
+
+# Перед UPSERT продукции освобождаем артикулы, которые переходят к другому изделию той же загрузки:
+# UNIQUE(article_number) проверяется построчно, и обмен артикулами иначе прервал бы весь пакет.
+# Временный артикул -product_id уникален; итоговое значение запишет следующий UPSERT.
+# Изделия вне загрузки свои артикулы не отдают — настоящий дубль по-прежнему дает ошибку.
+RELEASE_ARTICLES_QUERY = """
+    WITH incoming (product_name, article_number) AS (VALUES %s)
+    UPDATE products AS p
+    SET article_number = -p.product_id
+    FROM incoming i
+    WHERE p.article_number = i.article_number
+      AND p.product_name <> i.product_name
+      AND EXISTS (SELECT 1 FROM incoming own WHERE own.product_name = p.product_name)
+"""
+
+def ensure_row_hash_table(cursor):
+    """Создает таблицу с хешами импортированных строк (если ее нет)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS import_row_hashes (
+            table_name VARCHAR(64) NOT NULL,
+            row_key TEXT NOT NULL,
+            row_hash BIGINT NOT NULL,
+            PRIMARY KEY (table_name, row_key)
+        )
+    """)
+
+def compute_row_keys(table, df):
+    """Строит строковый естественный ключ для каждой строки"""
+    keys = df[NATURAL_KEYS[table]].astype(str)
+    if len(keys.columns) == 1:
+        return keys.iloc[:, 0]
+    return keys.iloc[:, 0].str.cat([keys[column] for column in keys.columns[1:]], sep='\x1f')
+
+def compute_row_hashes(df):
+    """Векторно хеширует строки DataFrame (64-битный хеш по всем колонкам)"""
+    return pd.util.hash_pandas_object(df, index=False).astype('int64')
+
+def fetch_id_map(cursor, table):
+    """Возвращает словарь {естественный ключ: первичный ключ} для справочника"""
+    cursor.execute(EXISTING_KEYS_QUERIES[table])
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+def fetch_existing_keys(cursor, table):
+    """Возвращает Series {строковый ключ: первичный ключ} для строк таблицы в БД"""
+    cursor.execute(EXISTING_KEYS_QUERIES[table])
+    rows = cursor.fetchall()
+    key_columns = NATURAL_KEYS[table]
+    existing = pd.DataFrame(rows, columns=key_columns + ['pk'])
+    if existing.empty:
+        return pd.Series(dtype='int64')
+    return pd.Series(existing['pk'].values, index=compute_row_keys(table, existing).values)
+
+def resolve_foreign_keys(cursor, table, df, id_maps=None):
+    """
+    Подставляет ID справочников вместо имен.
+    Возвращает строки для вставки и маску строк, для которых нашлись все ссылки.
+    """
+    id_maps = id_maps or {}
+    
+    def id_map(parent):
+        if parent not in id_maps:
+            id_maps[parent] = fetch_id_map(cursor, parent)
+        return id_maps[parent]
+    
+    if table == 'products':
+        resolved = pd.DataFrame({
+            'product_type_id': df['product_type_name'].map(id_map('product_types')),
+            'product_name': df['product_name'],
+            'article_number': df['article_number'],
+            'minimum_partner_price': df['minimum_partner_price'],
+            'material_type_id': df['material_type_name'].map(id_map('material_types'))
+        })
+    elif table == 'product_workshops':
+        resolved = pd.DataFrame({
+            'product_id': df['product_name'].map(id_map('products')),
+            'workshop_id': df['workshop_name'].map(id_map('workshops')),
+            'manufacturing_time_hours': df['manufacturing_time_hours']
+        })
+    else:
+        return df, pd.Series(True, index=df.index)
+    
+    found = resolved.notna().all(axis=1)
+    id_columns = [column for column in resolved.columns if column.endswith('_id')]
+    return resolved[found].astype({column: 'int64' for column in id_columns}), found
+
+def dataframe_rows(df):
+    """Преобразует DataFrame в список кортежей с нативными типами Python для psycopg2"""
+    return list(df.astype(object).itertuples(index=False, name=None))
+
+def delete_stale_rows(cursor, table, incoming_keys, summary):
+    """Удаляет из таблицы строки, которых больше нет в источнике"""
+    existing = fetch_existing_keys(cursor, table)
+    stale = existing[~existing.index.isin(incoming_keys)]
+    
+    if len(stale) > 0:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {PRIMARY_KEYS[table]} = ANY(%s)",
+            ([int(pk) for pk in stale.values],)
+        )
+        cursor.execute(
+            "DELETE FROM import_row_hashes WHERE table_name = %s AND row_key = ANY(%s)",
+            (table, list(stale.index))
+        )
+    
+    summary[table]['deleted'] = len(stale)
+
+def upsert_changed_rows(cursor, table, df, summary):
+    """Вставляет новые и обновляет измененные строки, сравнивая хеши с сохраненными"""
+    keys = compute_row_keys(table, df)
+    hashes = compute_row_hashes(df)
+    
+    cursor.execute(
+        "SELECT row_key, row_hash FROM import_row_hashes WHERE table_name = %s",
+        (table,)
+    )
+    stored = dict(cursor.fetchall())
+    
+    # Сравниваем как int Python: через Series с пропусками хеш превратился бы во float
+    changed = np.array([
+        stored.get(key) != row_hash
+        for key, row_hash in zip(keys.tolist(), hashes.tolist())
+    ], dtype=bool)
+    changed_df = df[changed]
+    resolved, found = resolve_foreign_keys(cursor, table, changed_df)
+    
+    inserted = updated = 0
+    if len(resolved) > 0:
+        if table == 'products':
+            # Одним запросом на всю загрузку: обмен может попасть в разные страницы UPSERT
+            execute_values(
+                cursor,
+                RELEASE_ARTICLES_QUERY,
+                dataframe_rows(resolved[['product_name', 'article_number']]),
+                page_size=len(resolved)
+            )
+        results = execute_values(
+            cursor,
+            UPSERT_QUERIES[table],
+            dataframe_rows(resolved),
+            page_size=1000,
+            fetch=True
+        )
+        inserted = sum(1 for row in results if row[0])
+        updated = len(results) - inserted
+        
+        # Запоминаем хеши только успешно загруженных строк
+        loaded_keys = keys[changed][found.values]
+        loaded_hashes = hashes[changed][found.values]
+        execute_values(
+            cursor,
+            """
+            INSERT INTO import_row_hashes (table_name, row_key, row_hash)
+            VALUES %s
+            ON CONFLICT (table_name, row_key) DO UPDATE
+            SET row_hash = EXCLUDED.row_hash
+            """,
+            [(table, key, int(row_hash)) for key, row_hash in zip(loaded_keys, loaded_hashes)],
+            page_size=1000
+        )
+    
+    summary[table].update({
+        'inserted': inserted,
+        'updated': updated,
+        'skipped': int((~found).sum())
+    })
+    # Измененные по хешу строки, совпавшие с БД, тоже считаются неизмененными
+    summary[table]['unchanged'] = len(df) - inserted - updated - summary[table]['skipped']
+    return keys
+
+def seed_row_hashes(cursor, frames):
+    """
+    Записывает хеши всех загруженных строк после полной загрузки,
+    чтобы первый дифференциальный импорт не переписывал неизмененные строки
+    """
+    cursor.execute("DELETE FROM import_row_hashes")
+    id_maps = {}
+    for table in IMPORT_ORDER:
+        df = normalize_source(table, frames[table])
+        _, found = resolve_foreign_keys(cursor, table, df, id_maps)
+        keys = compute_row_keys(table, df)[found.values]
+        hashes = compute_row_hashes(df)[found.values]
+        # Повтор ключа загружен последней строкой
+        last = ~keys.duplicated(keep='last').values
+        execute_values(
+            cursor,
+            "INSERT INTO import_row_hashes (table_name, row_key, row_hash) VALUES %s",
+            [(table, key, int(row_hash)) for key, row_hash in zip(keys[last], hashes[last])],
+            page_size=1000
+        )
+
+def import_incremental(cursor, sources, tables=None):
+    """
+    Дифференциальный импорт: загружает только новые, измененные и удаленные строки.
+    Строки сравниваются по хешам, сохраненным в import_row_hashes при прошлом импорте.
+    tables ограничивает импорт частью таблиц (по умолчанию — все).
+    """
+    print("\n🔄 Дифференциальный импорт...")
+    
+    ensure_row_hash_table(cursor)
+    
+    tables = [table for table in IMPORT_ORDER if tables is None or table in tables]
+    frames = {table: normalize_source(table, sources[table]) for table in tables}
+    
+    summary = {table: {} for table in tables}
+    incoming_keys = {table: compute_row_keys(table, frames[table]) for table in tables}
+    
+    # Сначала удаляем устаревшие зависимые строки, чтобы освободить уникальные значения
+    for table in ['product_workshops', 'products']:
+        if table in tables:
+            delete_stale_rows(cursor, table, incoming_keys[table], summary)
+    
+    # Затем вставляем и обновляем строки в порядке зависимостей
+    for table in tables:
+        upsert_changed_rows(cursor, table, frames[table], summary)
+    
+    # И в конце удаляем справочники, на которые больше никто не ссылается
+    for table in ['workshops', 'product_types', 'material_types']:
+        if table in tables:
+            delete_stale_rows(cursor, table, incoming_keys[table], summary)
+    
+    print("\n📋 Сводка изменений:")
+    for table in tables:
+        stats = summary[table]
+        print(f"   📌 {table}: +{stats['inserted']} добавлено, "
+              f"~{stats['updated']} обновлено, -{stats['deleted']} удалено, "
+              f"{stats['unchanged']} без изменений"
+              + (f", ⚠️  {stats['skipped']} пропущено" if stats['skipped'] else ""))
+    
+    return summary
+
+def run_incremental_import(conn, frames, metrics):
+    """Выполняет дифференциальный импорт в одной транзакции"""
+    cursor = conn.cursor()
+    try:
+        started = time.perf_counter()
+        summary = import_incremental(cursor, frames)
+        conn.commit()
+        metrics.record_stage('load', time.perf_counter() - started)
+        for table, stats in summary.items():
+            metrics.record_table(table, rows_loaded=stats['inserted'] + stats['updated'], changes=stats)
+        if verify_import(cursor, frames) is None:
+            return False
+        print("\n🎉 Дифференциальный импорт завершен")
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка дифференциального импорта: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+# ==================== СЕРВЕРНАЯ ПЕРЕЗАГРУЗКА ====================
+# Файлы, которые import_from_excel() читает из каталога на сервере БД.
+# Колонки совпадают с normalize_source: ссылки на справочники — по именам.
+SERVER_CSV_FILES = {table: f"{table}.csv" for table in IMPORT_ORDER}
+
+STAGING_TABLES = {
+    'material_types': """
+        material_type_name VARCHAR(255),
+        raw_material_loss_percent DECIMAL(5,2)
+    """,
+    'product_types': """
+        product_type_name VARCHAR(255),
+        product_type_coefficient DECIMAL(10,2)
+    """,
+    'workshops': """
+        workshop_name VARCHAR(255),
+        workshop_type VARCHAR(100),
+        staff_count INT
+    """,
+    'products': """
+        product_type_name VARCHAR(255),
+        product_name VARCHAR(500),
+        article_number BIGINT,
+        minimum_partner_price DECIMAL(12,2),
+        material_type_name VARCHAR(255)
+    """,
+    'product_workshops': """
+        product_name VARCHAR(500),
+        workshop_name VARCHAR(255),
+        manufacturing_time_hours DECIMAL(8,2)
+    """
+}
+
+# Строки промежуточных таблиц в формате VALUES из UPSERT_QUERIES (по одной на естественный ключ)
+STAGING_SELECTS = {
+    'material_types': """
+        SELECT DISTINCT ON (material_type_name) material_type_name, raw_material_loss_percent
+        FROM staging_material_types
+        ORDER BY material_type_name
+    """,
+    'product_types': """
+        SELECT DISTINCT ON (product_type_name) product_type_name, product_type_coefficient
+        FROM staging_product_types
+        ORDER BY product_type_name
+    """,
+    'workshops': """
+        SELECT DISTINCT ON (workshop_name) workshop_name, workshop_type, staff_count
+        FROM staging_workshops
+        ORDER BY workshop_name
+    """,
+    'products': """
+        SELECT DISTINCT ON (s.product_name)
+               pt.product_type_id, s.product_name, s.article_number,
+               s.minimum_partner_price, mt.material_type_id
+        FROM staging_products s
+        JOIN product_types pt ON pt.product_type_name = s.product_type_name
+        JOIN material_types mt ON mt.material_type_name = s.material_type_name
+        ORDER BY s.product_name
+    """,
+    'product_workshops': """
+        SELECT DISTINCT ON (p.product_id, w.workshop_id)
+               p.product_id, w.workshop_id, s.manufacturing_time_hours
+        FROM staging_product_workshops s
+        JOIN products p ON p.product_name = s.product_name
+        JOIN workshops w ON w.workshop_name = s.workshop_name
+        ORDER BY p.product_id, w.workshop_id
+    """
+}
+
+# Строки, чьи ссылки не нашлись после слияния справочников: их загрузка прерывает транзакцию
+STAGING_ORPHANS_QUERIES = {
+    'products': """
+        SELECT COUNT(*) FROM staging_products s
+        WHERE NOT EXISTS (SELECT 1 FROM product_types pt WHERE pt.product_type_name = s.product_type_name)
+           OR NOT EXISTS (SELECT 1 FROM material_types mt WHERE mt.material_type_name = s.material_type_name)
+    """,
+    'product_workshops': """
+        SELECT COUNT(*) FROM staging_product_workshops s
+        WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.product_name = s.product_name)
+           OR NOT EXISTS (SELECT 1 FROM workshops w WHERE w.workshop_name = s.workshop_name)
+    """
+}
+
+STAGING_STALE_DELETES = {
+    'product_workshops': """
+        DELETE FROM product_workshops pw
+        USING products p, workshops w
+        WHERE p.product_id = pw.product_id
+          AND w.workshop_id = pw.workshop_id
+          AND NOT EXISTS (
+              SELECT 1 FROM staging_product_workshops s
+              WHERE s.product_name = p.product_name AND s.workshop_name = w.workshop_name
+          )
+    """,
+    'products': """
+        DELETE FROM products t
+        WHERE NOT EXISTS (SELECT 1 FROM staging_products s WHERE s.product_name = t.product_name)
+    """,
+    'material_types': """
+        DELETE FROM material_types t
+        WHERE NOT EXISTS (SELECT 1 FROM staging_material_types s WHERE s.material_type_name = t.material_type_name)
+    """,
+    'product_types': """
+        DELETE FROM product_types t
+        WHERE NOT EXISTS (SELECT 1 FROM staging_product_types s WHERE s.product_type_name = t.product_type_name)
+    """,
+    'workshops': """
+        DELETE FROM workshops t
+        WHERE NOT EXISTS (SELECT 1 FROM staging_workshops s WHERE s.workshop_name = t.workshop_name)
+    """
+}
+
+def build_server_reload_function():
+    """
+    Собирает PL/pgSQL-функцию import_from_excel(source_dir): COPY всех пяти CSV в промежуточные
+    таблицы и слияние с рабочими таблицами теми же правилами, что и дифференциальный импорт.
+    """
+    entities = {
+        'material_types': 'Материалы',
+        'product_types': 'Типы продукции',
+        'workshops': 'Цехи',
+        'products': 'Продукция',
+        'product_workshops': 'Связи с цехами'
+    }
     
-    sql_function = """
-    CREATE OR REPLACE FUNCTION import_from_excel()
+    body = []
+    
+    # Промежуточные таблицы живут до конца транзакции вызывающего
+    for table in IMPORT_ORDER:
+        body.append(f"""
+        DROP TABLE IF EXISTS pg_temp.staging_{table};
+        CREATE TEMP TABLE staging_{table} ({STAGING_TABLES[table]}) ON COMMIT DROP;
+        EXECUTE format(
+            'COPY staging_{table} FROM %L WITH (FORMAT csv, HEADER true, ENCODING ''UTF8'')',
+            source_dir || '/{SERVER_CSV_FILES[table]}'
+        );""")
+    
+    # Сначала удаляем устаревшие связи и продукцию: освобождаются артикулы и ссылки
+    for table in ('product_workshops', 'products'):
+        body.append(f"""
+        {STAGING_STALE_DELETES[table].strip()};""")
+    
+    for table in IMPORT_ORDER:
+        if table in STAGING_ORPHANS_QUERIES:
+            body.append(f"""
+        {STAGING_ORPHANS_QUERIES[table].strip()} INTO rec_count;
+        IF rec_count > 0 THEN
+            RAISE EXCEPTION '{entities[table]}: % строк ссылаются на отсутствующие записи', rec_count;
+        END IF;""")
+        if table == 'products':
+            release = RELEASE_ARTICLES_QUERY.replace(
+                'VALUES %s', 'SELECT product_name, article_number FROM staging_products'
+            )
+            body.append(f"""
+        {release.strip()};""")
+        # Считаем строки, которые слияние действительно вставило или обновило, а не строки CSV
+        upsert = UPSERT_QUERIES[table].replace('VALUES %s', STAGING_SELECTS[table].strip()).strip()
+        body.append(f"""
+        WITH merged AS (
+        {upsert}
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted)
+        INTO inserted_count, updated_count FROM merged;
+        result_text := result_text || '{entities[table]}: +' || inserted_count
+            || ' добавлено, ~' || updated_count || ' обновлено; ';""")
+    
+    for table in ('material_types', 'product_types', 'workshops'):
+        body.append(f"""
+        {STAGING_STALE_DELETES[table].strip()};""")
+    
+    # Хеши строк больше не описывают содержимое таблиц — дифференциальный импорт сравнит все заново
+    body.append("""
+        IF to_regclass('import_row_hashes') IS NOT NULL THEN
+            DELETE FROM import_row_hashes;
+        END IF;""")
+    
+    return f"""
+    CREATE OR REPLACE FUNCTION import_from_excel(source_dir TEXT)
     RETURNS TEXT AS $$
     DECLARE
         result_text TEXT := '';
-        rec_count INTEGER;
-    BEGIN
-        -- Очистка данных
-        DELETE FROM product_workshops;
-        DELETE FROM products;
-        DELETE FROM product_types;
-        DELETE FROM material_types;
-        DELETE FROM workshops;
-        
-        -- Импорт типов материалов (пример - нужно адаптировать под ваши данные)
-        -- В реальной реализации здесь был бы COPY или внешние таблицы
-        INSERT INTO material_types (material_type_name, raw_material_loss_percent) VALUES
-        ('Мебельный щит из массива дерева', 0.80),
-        ('Ламинированное ДСП', 0.70),
-        ('Фанера', 0.55),
-        ('МДФ', 0.30);
-        
-        GET DIAGNOSTICS rec_count = ROW_COUNT;
-        result_text := result_text || 'Материалы: ' || rec_count || ' записей; ';
-        
-        -- Импорт типов продукции
-        INSERT INTO product_types (product_type_name, product_type_coefficient) VALUES
-        ('Гостиные', 3.5),
-        ('Прихожие', 5.6),
-        ('Мягкая мебель', 3.0),
-        ('Кровати', 4.7),
-        ('Шкафы', 1.5),
-        ('Комоды', 2.3);
-        
-        GET DIAGNOSTICS rec_count = ROW_COUNT;
-        result_text := result_text || 'Типы продукции: ' || rec_count || ' записей; ';
-        
-        -- Импорт цехов
-        INSERT INTO workshops (workshop_name, workshop_type, staff_count) VALUES
-        ('Проектный', 'Проектирование', 4),
-        ('Расчетный', 'Проектирование', 5),
-        ('Раскроя', 'Обработка', 5),
-        ('Обработки', 'Обработка', 6),
-        ('Сушильный', 'Сушка', 3),
-        ('Покраски', 'Обработка', 5),
-        ('Столярный', 'Обработка', 7),
-        ('Изготовления изделий из искусственного камня и композитных материалов', 'Обработка', 3),
-        ('Изготовления мягкой мебели', 'Обработка', 5),
-        ('Монтажа стеклянных, зеркальных вставок и других изделий', 'Сборка', 2),
-        ('Сборки', 'Сборка', 6),
-        ('Упаковки', 'Сборка', 4);
-        
-        GET DIAGNOSTICS rec_count = ROW_COUNT;
-        result_text := result_text || 'Цехи: ' || rec_count || ' записей; ';
+        rec_count BIGINT;
+        inserted_count BIGINT;
+        updated_count BIGINT;
+    BEGIN{''.join(body)}
         
         RETURN result_text;
     END;
     $$ LANGUAGE plpgsql;
     """
+
+def create_excel_import_function(cursor):
+    """
+    Создает функцию import_from_excel(source_dir) для перезагрузки данных на стороне сервера.
+    COPY из файла требует прав суперпользователя или роли pg_read_server_files.
+    """
+    print("\n⚙️  Создание функции для импорта из Excel...")
     
     try:
-        cursor.execute(sql_function)
-        print("✅ Функция import_from_excel() создана")
+        cursor.execute(build_server_reload_function())
+        print("✅ Функция import_from_excel(source_dir) создана")
         return True
     except Exception as e:
         print(f"⚠️  Ошибка создания функции: {e}")
         return False
 
-def main():
-    """Основная функция импорта"""
-    print("=" * 70)
-    print("📥 ИМПОРТ ДАННЫХ ИЗ EXCEL В БАЗУ ДАННЫХ")
-    print("=" * 70)
+def export_server_sources(frames, directory):
+    """Записывает проверенные источники в CSV-файлы для import_from_excel()"""
+    print(f"\n💾 Выгрузка CSV для серверной перезагрузки в {directory}...")
     
-    # Проверяем наличие файлов
-    if not check_excel_files():
-        sys.exit(1)
+    os.makedirs(directory, exist_ok=True)
+    for table in IMPORT_ORDER:
+        path = os.path.join(directory, SERVER_CSV_FILES[table])
+        df = normalize_source(table, frames[table]).drop_duplicates()
+        df.to_csv(path, index=False, encoding='utf-8')
+        print(f"   ✅ {table}: {len(df)} строк → {path}")
+    
+    print("💡 Скопируйте каталог на сервер БД и выполните: python import_excel_data.py --server-reload <каталог>")
+    return True
+
+def run_server_reload(directory, metrics):
+    """Перезагружает все таблицы одним вызовом import_from_excel() в одной транзакции"""
+    print(f"\n🚀 Серверная перезагрузка из {directory}...")
     
-    # Подключаемся к базе данных
     conn = get_db_connection()
     if not conn:
-        print("❌ Не удалось подключиться к базе данных")
-        sys.exit(1)
+        return False
     
+    cursor = conn.cursor()
     try:
-        cursor = conn.cursor()
+        if not create_excel_import_function(cursor):
+            conn.rollback()
+            return False
         
-        # Очищаем существующие данные
-        clear_existing_data(cursor)
+        started = time.perf_counter()
+        cursor.execute("SELECT import_from_excel(%s)", (directory,))
+        result = cursor.fetchone()[0]
         conn.commit()
+        metrics.record_stage('load', time.perf_counter() - started)
         
-        # Импортируем данные по порядку зависимостей
-        success = True
-        
-        # 1. Типы материалов
-        if not import_material_types(cursor):
-            success = False
+        print(f"✅ {result}")
+        print(f"⏱️  Перезагрузка заняла {time.perf_counter() - started:.3f} с")
+        verify_import(cursor)
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка серверной перезагрузки: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+# ==================== ПАРАЛЛЕЛЬНАЯ ЗАГРУЗКА ПО ГРАФУ ЗАВИСИМОСТЕЙ ====================
+
+def run_import_graph(load_table, workers=IMPORT_WORKERS):
+    """
+    Загружает таблицы по графу TABLE_DEPENDENCIES на пуле соединений.
+    Независимые таблицы грузятся одновременно, каждая на своем соединении и в своей транзакции;
+    зависимая таблица стартует сразу после фиксации всех родителей.
+    load_table(table, cursor) должна вернуть True при успехе.
+    Возвращает признак успеха, общее время и {таблица: (смещение старта, длительность)}.
+    """
+    pool = ThreadedConnectionPool(1, workers, **DB_CONFIG)
+    run_started = time.perf_counter()
+    timeline = {}
+    
+    def run(table):
+        conn = pool.getconn()
+        conn.autocommit = False
+        cursor = conn.cursor()
+        started = time.perf_counter()
+        try:
+            ok = load_table(table, cursor)
+            if ok:
+                conn.commit()
+            else:
+                conn.rollback()
+            return ok
+        except Exception as e:
+            print(f"❌ Ошибка загрузки {table}: {e}")
+            conn.rollback()
+            return False
+        finally:
+            timeline[table] = (started - run_started, time.perf_counter() - started)
+            cursor.close()
+            pool.putconn(conn)
+    
+    completed = set()
+    failed = set()
+    submitted = set()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            
+            def submit_ready():
+                for table in IMPORT_ORDER:
+                    parents = TABLE_DEPENDENCIES[table]
+                    if table not in submitted and all(parent in completed for parent in parents):
+                        submitted.add(table)
+                        futures[executor.submit(run, table)] = table
+            
+            submit_ready()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    table = futures.pop(future)
+                    if future.result():
+                        completed.add(table)
+                    else:
+                        failed.add(table)
+                submit_ready()
+    finally:
+        pool.closeall()
+    
+    wall_clock = time.perf_counter() - run_started
+    skipped = [table for table in IMPORT_ORDER if table not in submitted]
+    
+    print("\n⏱️  План загрузки:")
+    for table in IMPORT_ORDER:
+        if table in timeline:
+            offset, elapsed = timeline[table]
+            status = "✅" if table in completed else "❌"
+            print(f"   {status} {table}: старт +{offset:.3f} с, длительность {elapsed:.3f} с")
+        else:
+            print(f"   ⏭️  {table}: не запускалась (ошибка в родительской таблице)")
+    serial_time = sum(elapsed for _, elapsed in timeline.values())
+    print(f"   📌 Общее время: {wall_clock:.3f} с "
+          f"(последовательно: {serial_time:.3f} с, ускорение x{serial_time / wall_clock if wall_clock else 1:.1f})")
+    
+    return not failed and not skipped, wall_clock, timeline
+
+# ==================== БЫСТРАЯ ПОЛНАЯ ПЕРЕЗАГРУЗКА ====================
+
+# Вторичные индексы: все индексы таблиц импорта, кроме обеспечивающих PK/UNIQUE-ограничения
+SECONDARY_INDEXES_QUERY = """
+    SELECT i.indexrelid::regclass::text AS index_name,
+           pg_get_indexdef(i.indexrelid) AS index_definition
+    FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    WHERE t.relname = ANY(%s)
+      AND t.relnamespace = current_schema()::regnamespace
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+    ORDER BY 1
+"""
+
+# Внешние ключи таблиц импорта: на время COPY снимаются и возвращаются до фиксации —
+# одна проверка всей таблицы вместо построчных триггеров
+FOREIGN_KEYS_QUERY = """
+    SELECT c.conrelid::regclass::text AS table_name,
+           c.conname AS constraint_name,
+           pg_get_constraintdef(c.oid) AS constraint_definition
+    FROM pg_constraint c
+    JOIN pg_class t ON t.oid = c.conrelid
+    WHERE c.contype = 'f'
+      AND t.relname = ANY(%s)
+      AND t.relnamespace = current_schema()::regnamespace
+    ORDER BY 1, 2
+"""
+
+INDEX_BUILD_WORKERS = 4
+INDEX_BUILD_MAINTENANCE_WORK_MEM = '256MB'
+
+def copy_frame(cursor, table, df):
+    """Загружает DataFrame в таблицу одной командой COPY FROM STDIN"""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    return len(df)
+
+def ensure_pending_index_table(cursor):
+    """Создает таблицу определений удаленных индексов (если ее нет)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS import_pending_indexes (
+            index_name TEXT PRIMARY KEY,
+            index_definition TEXT NOT NULL
+        )
+    """)
+
+def build_index(index_name, index_definition):
+    """
+    Строит один индекс на отдельном соединении и в той же транзакции
+    снимает его с учета в import_pending_indexes
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError(f"нет соединения для построения {index_name}")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SET maintenance_work_mem = '{INDEX_BUILD_MAINTENANCE_WORK_MEM}'")
+        started = time.perf_counter()
+        cursor.execute("SELECT to_regclass(%s) IS NULL", (index_name,))
+        if cursor.fetchone()[0]:
+            cursor.execute(index_definition)
+        cursor.execute("DELETE FROM import_pending_indexes WHERE index_name = %s", (index_name,))
         conn.commit()
+        return index_name, time.perf_counter() - started
+    finally:
+        conn.close()
+
+def rebuild_pending_indexes(cursor):
+    """
+    Параллельно строит все индексы из import_pending_indexes; не построенные
+    повторяются по одному. Возвращает имена индексов, которые так и не удалось построить.
+    """
+    cursor.execute("SELECT index_name, index_definition FROM import_pending_indexes ORDER BY 1")
+    pending = dict(cursor.fetchall())
+    cursor.connection.commit()
+    
+    failed = []
+    with ThreadPoolExecutor(max_workers=INDEX_BUILD_WORKERS) as executor:
+        futures = {executor.submit(build_index, name, definition): name for name, definition in pending.items()}
+        for future in as_completed(futures):
+            try:
+                index_name, elapsed = future.result()
+                print(f"   🔧 {index_name} ({elapsed:.3f} с)")
+            except Exception as e:
+                print(f"   ⚠️  {futures[future]}: {e}")
+                failed.append(futures[future])
+    
+    # Повтор — последовательно, без конкуренции за память и блокировки
+    not_rebuilt = []
+    for index_name in sorted(failed):
+        try:
+            build_index(index_name, pending[index_name])
+            print(f"   🔧 {index_name} (повторно)")
+        except Exception as e:
+            print(f"   ❌ {index_name} не восстановлен: {e}")
+            not_rebuilt.append(index_name)
+    return not_rebuilt
+
+def import_fast_reset(conn, frames, metrics):
+    """
+    Полная перезагрузка без построчного обслуживания индексов и проверок внешних ключей:
+    TRUNCATE ... RESTART IDENTITY, удаление вторичных индексов и внешних ключей, COPY всех
+    таблиц, возврат внешних ключей (одна проверка на ключ), параллельное восстановление
+    индексов и ANALYZE. Печатает время каждого этапа.
+    
+    Внешние ключи возвращаются до фиксации: данные без проверенной целостности не видны
+    никому. Индексы строятся после фиксации на отдельных соединениях, поэтому до конца
+    этапа rebuild_indexes таблицы читаются с уже новыми данными, но без вторичных
+    индексов — запросы верны, но могут быть медленнее. Запускайте --fast-reset в окно
+    обслуживания.
+    """
+    print("\n🚀 Быстрая полная перезагрузка...")
+    timings = {}
+    cursor = conn.cursor()
+    
+    # 1. Очистка, удаление вторичных индексов и внешних ключей, загрузка и возврат ключей —
+    #    одна транзакция: при ошибке откатится все, включая DROP. Индексы строятся уже после фиксации,
+    #    поэтому их определения сохраняются в import_pending_indexes в той же транзакции,
+    #    что и DROP: при сбое построения они не теряются и будут построены следующим запуском.
+    started = time.perf_counter()
+    ensure_row_hash_table(cursor)
+    ensure_pending_index_table(cursor)
+    cursor.execute(
+        f"TRUNCATE {', '.join(reversed(IMPORT_ORDER))}, import_row_hashes RESTART IDENTITY"
+    )
+    timings['truncate'] = time.perf_counter() - started
+    print(f"   🧹 Таблицы очищены ({timings['truncate']:.3f} с)")
+    
+    started = time.perf_counter()
+    cursor.execute(SECONDARY_INDEXES_QUERY, (IMPORT_ORDER,))
+    indexes = cursor.fetchall()
+    for index_name, index_definition in indexes:
+        cursor.execute(
+            "INSERT INTO import_pending_indexes (index_name, index_definition) VALUES (%s, %s) "
+            "ON CONFLICT (index_name) DO UPDATE SET index_definition = EXCLUDED.index_definition",
+            (index_name, index_definition)
+        )
+        cursor.execute(f"DROP INDEX {index_name}")
+    timings['drop_indexes'] = time.perf_counter() - started
+    print(f"   🗑️  Удалено вторичных индексов: {len(indexes)} ({timings['drop_indexes']:.3f} с)")
+    
+    started = time.perf_counter()
+    cursor.execute(FOREIGN_KEYS_QUERY, (IMPORT_ORDER,))
+    foreign_keys = cursor.fetchall()
+    for table_name, constraint_name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint_name}")
+    timings['drop_foreign_keys'] = time.perf_counter() - started
+    print(f"   🗑️  Снято внешних ключей: {len(foreign_keys)} ({timings['drop_foreign_keys']:.3f} с)")
+    
+    # 2. Массовая загрузка в порядке зависимостей
+    started = time.perf_counter()
+    for table in IMPORT_ORDER:
+        table_started = time.perf_counter()
+        rows = normalize_source(table, frames[table])
+        rows, _ = resolve_foreign_keys(cursor, table, rows)
+        loaded = copy_frame(cursor, table, rows)
+        metrics.record_table(table, rows_loaded=loaded, load_seconds=round(time.perf_counter() - table_started, 3))
+        print(f"   📥 {table}: {loaded} записей")
+    seed_row_hashes(cursor, frames)
+    timings['load'] = time.perf_counter() - started
+    print(f"   ✅ Данные загружены ({timings['load']:.3f} с)")
+    
+    # Нарушение ключа откатывает всю транзакцию, вместе с TRUNCATE и удалением индексов
+    started = time.perf_counter()
+    for table_name, constraint_name, constraint_definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} {constraint_definition}")
+    conn.commit()
+    timings['restore_foreign_keys'] = time.perf_counter() - started
+    print(f"   ✅ Внешние ключи проверены и восстановлены ({timings['restore_foreign_keys']:.3f} с)")
+    
+    # 3. Параллельное восстановление индексов (каждый индекс — на своем соединении),
+    #    включая оставшиеся от прошлого неудачного запуска
+    started = time.perf_counter()
+    not_rebuilt = rebuild_pending_indexes(cursor)
+    timings['rebuild_indexes'] = time.perf_counter() - started
+    if not_rebuilt:
+        raise RuntimeError(
+            f"не восстановлены индексы: {', '.join(not_rebuilt)} "
+            f"(определения сохранены в import_pending_indexes, повторите --fast-reset)"
+        )
+    print(f"   ✅ Индексы восстановлены ({timings['rebuild_indexes']:.3f} с)")
+    
+    # 4. Обновление статистики планировщика
+    started = time.perf_counter()
+    conn.autocommit = True
+    cursor.execute(f"ANALYZE {', '.join(IMPORT_ORDER)}")
+    conn.autocommit = False
+    timings['analyze'] = time.perf_counter() - started
+    print(f"   📈 ANALYZE выполнен ({timings['analyze']:.3f} с)")
+    
+    cursor.close()
+    return timings
+
+def run_fast_reset(conn, frames, metrics):
+    """Выполняет быструю перезагрузку и выводит время этапов"""
+    try:
+        timings = import_fast_reset(conn, frames, metrics)
+        for phase, elapsed in timings.items():
+            metrics.record_stage(phase, elapsed)
         
-        # 2. Типы продукции
-        if success and not import_product_types(cursor):
-            success = False
-        conn.commit()
+        print("\n⏱️  Время этапов:")
+        for phase, elapsed in timings.items():
+            print(f"   📌 {phase}: {elapsed:.3f} с")
+        print(f"   📌 итого: {sum(timings.values()):.3f} с")
         
-        # 3. Цехи
-        if success and not import_workshops(cursor):
-            success = False
+        cursor = conn.cursor()
+        total_records = verify_import(cursor, frames)
+        cursor.close()
+        if total_records is None:
+            return False
+        print("\n🎉 Быстрая перезагрузка завершена")
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка быстрой перезагрузки: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+# ==================== НАБЛЮДЕНИЕ ЗА ПАПКОЙ С ВЫГРУЗКАМИ ====================
+
+def load_watch_state():
+    """Контрольные суммы источников, импортированных демоном в прошлый раз"""
+    if not os.path.exists(WATCH_STATE_FILE):
+        return {}
+    with open(WATCH_STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_watch_state(state):
+    tmp_file = WATCH_STATE_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, WATCH_STATE_FILE)
+
+def file_signature(filename):
+    """Быстрый признак изменения файла без чтения содержимого"""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def with_dependents(tables):
+    """Добавляет к набору таблиц все зависящие от них (чтобы удаления не упирались в FK)"""
+    result = set(tables)
+    for table in IMPORT_ORDER:
+        if any(parent in result for parent in TABLE_DEPENDENCIES[table]):
+            result.add(table)
+    return [table for table in IMPORT_ORDER if table in result]
+
+def import_changed_sources(changed, checksums, parsed, metrics):
+    """
+    Инкрементально импортирует измененные источники и зависящие от них таблицы.
+    Неизмененные источники берутся из памяти и повторно не разбираются.
+    """
+    def load(table):
+        cached = parsed.get(table)
+        if cached and cached[0] == checksums[table]:
+            return cached[1]
+        df = read_source(table)
+        parsed[table] = (checksums[table], df)
+        return df
+    
+    frames, report = prepare_sources(load, metrics)
+    
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    cursor = conn.cursor()
+    try:
+        # Не держим очередь блокировок за собой: при конфликте с API попробуем в следующий раз
+        cursor.execute("SET lock_timeout = %s", (WATCH_LOCK_TIMEOUT,))
+        started = time.perf_counter()
+        summary = import_incremental(cursor, frames, with_dependents(changed))
         conn.commit()
+        metrics.record_stage('load', time.perf_counter() - started)
+        for table, stats in summary.items():
+            metrics.record_table(table, rows_loaded=stats['inserted'] + stats['updated'], changes=stats)
+        return True
+    except Exception as e:
+        print(f"❌ Ошибка импорта изменений: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def watch_sources(poll_interval=WATCH_POLL_SECONDS, debounce=WATCH_DEBOUNCE_SECONDS, metrics_path=None):
+    """
+    Демон: опрашивает файлы из EXCEL_FILES и, когда файл перестал меняться дольше debounce секунд
+    и его контрольная сумма отличается от импортированной, инкрементально загружает изменения.
+    """
+    print(f"\n👀 Наблюдение за источниками (опрос каждые {poll_interval} с, ожидание записи {debounce} с)")
+    print("💡 Нажмите Ctrl+C для остановки")
+    
+    # Фоновая работа не должна отнимать процессор у API
+    if hasattr(os, 'nice'):
+        os.nice(WATCH_NICE_INCREMENT)
+    
+    imported = load_watch_state()
+    parsed = {}
+    seen = {}  # таблица -> (подпись файла, момент последнего изменения подписи)
+    settled = {}  # таблица -> подпись, уже проверенная по контрольной сумме
+    
+    try:
+        while True:
+            now = time.monotonic()
+            ready = []
+            for table, filename in EXCEL_FILES.items():
+                signature = file_signature(filename)
+                if signature is None:
+                    continue
+                if seen.get(table, (None,))[0] != signature:
+                    seen[table] = (signature, now)
+                elif now - seen[table][1] >= debounce and settled.get(table) != signature:
+                    ready.append(table)
+            
+            if ready and len(seen) < len(EXCEL_FILES):
+                print("⚠️  Ожидание появления всех файлов-источников...")
+            elif ready:
+                checksums = {table: file_checksum(filename) for table, filename in EXCEL_FILES.items()}
+                changed = [table for table in ready if imported.get(table) != checksums[table]]
+                # Файл с прежней контрольной суммой проверен; измененный — только после
+                # успешного импорта, иначе неудачная загрузка повторится на следующем опросе
+                for table in ready:
+                    if table not in changed:
+                        settled[table] = seen[table][0]
+                
+                if changed:
+                    print(f"\n📂 {datetime.now():%H:%M:%S} изменились источники: {', '.join(changed)}")
+                    metrics = ImportMetrics('watch')
+                    success = import_changed_sources(changed, checksums, parsed, metrics)
+                    if success:
+                        imported.update({table: checksums[table] for table in changed})
+                        save_watch_state(imported)
+                        for table in changed:
+                            settled[table] = seen[table][0]
+                        print("✅ Изменения загружены")
+                    if metrics_path:
+                        metrics.write(metrics_path, success)
+            
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\n🛑 Наблюдение остановлено")
+    
+    return True
+
+def positive_int(value):
+    """Тип аргумента argparse: целое число больше нуля"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидалось целое число, получено '{value}'")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"значение должно быть больше нуля, получено {number}")
+    return number
+
+def parse_args():
+    """Разбирает аргументы командной строки"""
+    parser = argparse.ArgumentParser(description='Импорт данных в базу Premium Furniture Solutions')
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='загрузить только изменения вместо полной очистки и перезаливки'
+    )
+    parser.add_argument(
+        '--fast-reset',
+        action='store_true',
+        help='полная перезагрузка через TRUNCATE и COPY с перестроением индексов'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='следить за файлами-источниками и инкрементально загружать изменения'
+    )
+    parser.add_argument(
+        '--workers',
+        type=positive_int,
+        default=IMPORT_WORKERS,
+        help='число параллельных соединений для загрузки независимых таблиц'
+    )
+    parser.add_argument(
+        '--metrics-json',
+        metavar='PATH',
+        help="записать метрики импорта в JSON-файл ('-' — в stdout)"
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='только разобрать и проверить источники, ничего не записывая в БД'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='продолжить прерванный импорт с последнего зафиксированного пакета'
+    )
+    parser.add_argument(
+        '--export-server-csv',
+        metavar='DIR',
+        help='выгрузить проверенные источники в CSV для серверной перезагрузки'
+    )
+    parser.add_argument(
+        '--server-reload',
+        metavar='DIR',
+        help='перезагрузить все таблицы функцией import_from_excel() из каталога на сервере БД'
+    )
+    return parser.parse_args()
+
+def run_import(args, metrics):
+    """Выполняет импорт в выбранном режиме"""
+    # Пробный прогон: разбор и проверка без подключения к БД
+    if args.dry_run:
+        prepare_sources(read_source, metrics)
+        print("\n💡 Пробный прогон завершен, база данных не изменялась")
+        return True
+    
+    if args.export_server_csv:
+        frames, report = prepare_sources(read_source, metrics)
+        return export_server_sources(frames, args.export_server_csv)
+    
+    if args.resume:
+        print("\n⏩ Продолжение прерванного импорта...")
+        checkpoint = load_checkpoint()
+        if not checkpoint:
+            return False
+    elif not (args.incremental or args.fast_reset):
+        checkpoint = new_checkpoint()
+    
+    # Разбираем и проверяем источники до обращения к БД
+    if args.incremental or args.fast_reset:
+        frames, report = prepare_sources(read_source, metrics)
+    else:
+        frames, report = prepare_sources(lambda table: load_source(table, checkpoint), metrics)
+    
+    # Подключаемся к базе данных
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Не удалось подключиться к базе данных")
+        return False
+    
+    if args.incremental:
+        return run_incremental_import(conn, frames, metrics)
+    
+    if args.fast_reset:
+        return run_fast_reset(conn, frames, metrics)
+    
+    try:
+        cursor = conn.cursor()
         
-        # 4. Продукция (зависит от типов материалов и продукции)
-        if success and not import_products(cursor):
-            success = False
-        conn.commit()
+        # Очищаем существующие данные (при продолжении уже загруженное сохраняется)
+        if not args.resume:
+            ensure_row_hash_table(cursor)
+            clear_existing_data(cursor)
+            conn.commit()
+            save_checkpoint(checkpoint)
         
-        # 5. Связи продукции с цехами (зависит от продукции и цехов)
-        if success and not import_product_workshops(cursor):
-            success = False
-        conn.commit()
+        # Импортируем данные по графу зависимостей: справочники — параллельно
+        importers = {
+            'material_types': import_material_types,
+            'product_types': import_product_types,
+            'workshops': import_workshops,
+            'products': import_products,
+            'product_workshops': import_product_workshops
+        }
+        success, load_time, timeline = run_import_graph(
+            lambda table, table_cursor: importers[table](table_cursor, checkpoint, frames[table]),
+            args.workers
+        )
+        
+        metrics.record_stage('load', load_time)
+        for table, (_, elapsed) in timeline.items():
+            metrics.record_table(
+                table,
+                rows_loaded=checkpoint['tables'][table]['rows_loaded'],
+                load_seconds=round(elapsed, 3)
+            )
         
         # Проверяем результаты
-        if success:
-            total_records = verify_import(cursor)
-            
+        total_records = verify_import(cursor, frames) if success else None
+        
+        if total_records is not None:
             print("\n" + "=" * 70)
             print("🎉 ИМПОРТ УСПЕШНО ЗАВЕРШЕН!")
             print("=" * 70)
             print(f"📊 Всего импортировано записей: {total_records}")
             print("\n📁 Импортированные данные:")
-            print("   ✅ Material_type_import.xlsx → material_types")
-            print("   ✅ Product_type_import.xlsx → product_types")
-            print("   ✅ Workshops_import.xlsx → workshops")
-            print("   ✅ Products_import.xlsx → products")
-            print("   ✅ Product_workshops_import.xlsx → product_workshops")
+            for table, filename in EXCEL_FILES.items():
+                print(f"   ✅ {filename} → {table}")
             print("\n💡 Данные готовы к использованию в приложении!")
             
+            # Хеши строк для последующих дифференциальных импортов
+            seed_row_hashes(cursor, frames)
+            
             # Создаем функцию для быстрого импорта
             create_excel_import_function(cursor)
             conn.commit()
+            clear_checkpoint()
+            
+        elif success:
+            # Все пакеты зафиксированы, но содержимое расходится: продолжение не поможет
+            print("\n❌ Загруженные данные не совпадают с источниками")
+            conn.rollback()
+            clear_checkpoint()
+            success = False
             
         else:
             print("\n❌ Импорт завершен с ошибками")
             conn.rollback()
+            print("📌 Зафиксированные пакеты сохранены — продолжите импорт: python import_excel_data.py --resume")
             
     except Exception as e:
         print(f"❌ Критическая ошибка: {e}")
@@ -574,6 +2200,47 @@ def main():
     
     return success
 
+def import_main(args):
+    """Выбирает режим по аргументам и выполняет импорт; метрики пишутся при любом исходе"""
+    print("=" * 70)
+    print("📥 ИМПОРТ ДАННЫХ ИЗ EXCEL / CSV / PARQUET В БАЗУ ДАННЫХ")
+    print("=" * 70)
+    
+    # Демону достаточно следить за появлением файлов
+    if args.watch:
+        return watch_sources(metrics_path=args.metrics_json)
+    
+    mode = next(
+        (name for name in ('server_reload', 'dry_run', 'export_server_csv', 'incremental', 'fast_reset', 'resume')
+         if getattr(args, name)),
+        'full'
+    )
+    metrics = ImportMetrics(mode)
+    success = False
+    try:
+        # Серверной перезагрузке локальные файлы не нужны: CSV читает сам PostgreSQL
+        if args.server_reload:
+            success = run_server_reload(args.server_reload, metrics)
+        # Проверяем наличие файлов
+        elif check_excel_files():
+            success = run_import(args, metrics)
+    finally:
+        # Неудачные запуски тоже оставляют метрики
+        if args.metrics_json:
+            metrics.write(args.metrics_json, success)
+    
+    return success
+
+def main():
+    """Основная функция импорта"""
+    args = parse_args()
+    
+    # stdout занят документом метрик: прогресс уходит в stderr
+    if args.metrics_json == '-':
+        with contextlib.redirect_stdout(sys.stderr):
+            return import_main(args)
+    return import_main(args)
+
 if __name__ == "__main__":
     success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -1,5 +1,15 @@
 from flask import Flask, render_template_string, jsonify, request
+import functools
+import gzip
+import hashlib
 import json
+import marshal
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
 
 app = Flask(__name__)
 
@@ -44,11 +54,522 @@ INITIAL_PRODUCTS = [
     {"id": 4, "article": "BAR-001", "name": "Барный стул Manhattan", "product_type_id": 4, "material": "Ясень мореный", "min_price": 5000, "param1": 0.5, "param2": 0.5},
 ]
 
-products = INITIAL_PRODUCTS.copy()
+# ==================== ХРАНИЛИЩЕ ПРОДУКЦИИ ====================
+
+# Каталог для сохранения продукции между перезапусками; без него данные живут только в памяти
+PRODUCTS_DATA_DIR = os.environ.get("FURNITURE_DATA_DIR")
+SNAPSHOT_FILE = "products.snapshot"
+MUTATION_LOG_FILE = "products.log"
+SNAPSHOT_FORMAT = 2
+
+# Снимок пишется не чаще раза в SNAPSHOT_INTERVAL_SECONDS и только если журнал подрос
+SNAPSHOT_INTERVAL_SECONDS = 60
+SNAPSHOT_MIN_MUTATIONS = 1000
+
+
+class ProductRecord:
+    """
+    Запись о продукции. После создания не изменяется — ProductStore.update заменяет ее целиком,
+    на этом держится чтение без блокировок.
+    """
+    __slots__ = ("id", "article", "name", "product_type_id", "material", "min_price", "param1", "param2")
+
+    FIELDS = __slots__
+
+    def __init__(self, id, article, name, product_type_id, material, min_price, param1, param2):
+        self.id = id
+        self.article = article
+        self.name = name
+        self.product_type_id = product_type_id
+        self.material = material
+        self.min_price = min_price
+        self.param1 = param1
+        self.param2 = param2
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data[field] for field in cls.FIELDS))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def to_row(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+
+class MutationLog:
+    """
+    Журнал изменений продукции (JSON-строки, только дозапись) с групповой фиксацией.
+
+    Записи ставятся в очередь, фоновый поток пишет все накопившееся одним write и одним fsync.
+    Пока идет fsync, новые записи копятся для следующей группы, поэтому под нагрузкой
+    один fsync подтверждает сразу много изменений.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = 0  # записей с момента последнего снимка
+        self.groups = 0
+        self._file = open(path, "ab")
+        self._cond = threading.Condition()
+        self._pending = []
+        self._appended = 0
+        self._flushed = 0
+        self._error = None
+        threading.Thread(target=self._flush_loop, name="mutation-log", daemon=True).start()
+
+    def append(self, entry):
+        """Ставит запись в очередь; возвращает номер для wait"""
+        line = json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._cond:
+            self._pending.append(line)
+            self._appended += 1
+            self._cond.notify_all()
+            return self._appended
+
+    def wait(self, ticket=None):
+        """Ждет, пока запись (по умолчанию — все поставленные) окажется на диске"""
+        with self._cond:
+            ticket = self._appended if ticket is None else ticket
+            while self._flushed < ticket and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+
+    def truncate(self):
+        """Очищает журнал после записи снимка"""
+        self.wait()
+        with self._cond:
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries = 0
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch, self._pending = self._pending, []
+                last = self._appended
+            try:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._flushed = last
+                self.entries += len(batch)
+                self.groups += 1
+                self._cond.notify_all()
+
+
+def read_mutation_log(path):
+    """
+    Записи журнала; недописанный при сбое хвост отрезается. Строка без перевода строки
+    считается недописанной, даже если это корректный JSON: иначе следующая запись
+    приклеилась бы к ней и при новом запуске пропала бы вместе со всем после нее.
+    """
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    valid_length = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+            valid_length += len(line)
+    if valid_length != os.path.getsize(path):
+        os.truncate(path, valid_length)
+    return entries
+
+
+def write_snapshot(path, records, next_id, seq=0):
+    """
+    Атомарно записывает компактный снимок: marshal-кортеж строк.
+    seq — номер последней записи журнала, уже вошедшей в снимок.
+    """
+    data = marshal.dumps((SNAPSHOT_FORMAT, ProductRecord.FIELDS, next_id, seq, [record.to_row() for record in records]))
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    """Читает снимок через mmap без промежуточной копии файла; возвращает (next_id, seq, строки)"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        snapshot = marshal.loads(mapped)
+    # В снимках первого формата номера записей журнала не было
+    if snapshot[0] == 1:
+        snapshot_format, fields, next_id, rows = snapshot
+        seq = 0
+    else:
+        snapshot_format, fields, next_id, seq, rows = snapshot
+    if snapshot_format not in (1, SNAPSHOT_FORMAT) or tuple(fields) != ProductRecord.FIELDS:
+        raise ValueError(f"Неподдерживаемый формат снимка {path}")
+    return next_id, seq, rows
+
+
+class ProductStore:
+    """
+    Потокобезопасное хранилище продукции с индексами по id, артикулу и типу продукции.
+
+    Записи неизменяемы, поэтому чтение по ключу идет без блокировки. Это опирается на GIL
+    CPython: чтение и замена значения в словаре, присваивание ссылки self._snapshot и tuple()
+    по словарю выполняются атомарно. В сборке без GIL (free-threaded) читателям нужна блокировка.
+    Изменения сериализуются одной блокировкой; индексы поправляются за O(1).
+    Список всей продукции — снимок-кортеж, который строится заново первым чтением после
+    изменения и без блокировок отдается всем читателям. Пересборка копирует все записи:
+    при чередовании записей и чтений списка каждое изменение обходится в O(n).
+
+    С журналом (MutationLog) каждое изменение возвращается только после fsync.
+    """
+
+    def __init__(self, items=(), log=None):
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_article = {}
+        self._by_type = {}  # product_type_id -> {id: запись}, порядок добавления сохраняется
+        self._next_id = 1
+        self._seq = 0  # номер последнего изменения; пишется в журнал и в снимок
+        self._version = 0
+        self._snapshot = (-1, ())
+        self._log = None
+        for item in items:
+            self.add(item)
+        self._log = log
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def get_by_article(self, article):
+        return self._by_article.get(article)
+
+    def by_product_type(self, product_type_id):
+        return tuple(self._by_type.get(product_type_id, {}).values())
+
+    def snapshot(self):
+        """Все записи в порядке добавления; между изменениями возвращается один и тот же кортеж"""
+        version, records = self._snapshot
+        if version == self._version:
+            return records
+        # tuple() обходит словарь целиком, не отпуская GIL, поэтому снимок согласован без блокировки
+        version = self._version
+        records = tuple(self._by_id.values())
+        self._snapshot = (version, records)
+        return records
+
+    def add(self, data):
+        """Добавляет продукцию; без id назначается следующий свободный"""
+        with self._lock:
+            data = dict(data)
+            if data.get("id") is None:
+                data["id"] = self._next_id
+            record = ProductRecord.from_dict(data)
+            if record.id in self._by_id:
+                raise ValueError(f"Продукция с id {record.id} уже существует")
+            if record.article in self._by_article:
+                raise ValueError(f"Артикул {record.article} уже используется")
+            self._index(record)
+            self._next_id = max(self._next_id, record.id + 1)
+            self._version += 1
+            ticket = self._journal({"op": "put", "product": record.to_dict()})
+        self._commit(ticket)
+        return record
+
+    def update(self, product_id, **changes):
+        """Заменяет запись новой с измененными полями; возвращает ее или None"""
+        with self._lock:
+            current = self._by_id.get(product_id)
+            if current is None:
+                return None
+            data = current.to_dict()
+            data.update(changes)
+            data["id"] = product_id
+            record = ProductRecord.from_dict(data)
+            if record.article != current.article and record.article in self._by_article:
+                raise ValueError(f"Артикул {record.article} уже используется")
+            self._unindex(current, keep_id=True)
+            self._index(record)
+            self._version += 1
+            ticket = self._journal({"op": "put", "product": record.to_dict()})
+        self._commit(ticket)
+        return record
+
+    def delete(self, product_id):
+        """Удаляет продукцию; возвращает True, если она была"""
+        with self._lock:
+            current = self._by_id.get(product_id)
+            if current is None:
+                return False
+            self._unindex(current)
+            self._version += 1
+            ticket = self._journal({"op": "delete", "id": product_id})
+        self._commit(ticket)
+        return True
+
+    def load(self, rows, next_id=1, seq=0):
+        """Массовая загрузка строк снимка без проверок и журнала — для холодного старта"""
+        records = [ProductRecord(*row) for row in rows]
+        with self._lock:
+            # Индексы строятся целиком, без поштучного _index: так в разы быстрее
+            self._by_id.update((record.id, record) for record in records)
+            self._by_article.update((record.article, record) for record in records)
+            for record in records:
+                self._by_type.setdefault(record.product_type_id, {})[record.id] = record
+            self._next_id = max(next_id, self._next_id, max(self._by_id, default=0) + 1)
+            self._seq = max(self._seq, seq)
+            self._version += 1
+
+    def replay(self, entries):
+        """
+        Повторяет записи журнала. Записи, уже вошедшие в снимок (по номеру seq), пропускаются:
+        журнал может пережить снимок, если сбой случился между записью снимка и очисткой журнала.
+        """
+        with self._lock:
+            for entry in entries:
+                seq = entry.get("seq")
+                if seq is not None:
+                    if seq <= self._seq:
+                        continue
+                    self._seq = seq
+                if entry["op"] == "put":
+                    record = ProductRecord.from_dict(entry["product"])
+                    current = self._by_id.get(record.id)
+                    if current is not None:
+                        self._unindex(current)
+                    self._index(record)
+                    self._next_id = max(self._next_id, record.id + 1)
+                elif entry["op"] == "delete" and entry["id"] in self._by_id:
+                    self._unindex(self._by_id[entry["id"]])
+            self._version += 1
+
+    def attach_log(self, log):
+        """Начинает записывать изменения в журнал"""
+        with self._lock:
+            self._log = log
+
+    def compact(self, snapshot_path):
+        """Пишет снимок текущего состояния и очищает журнал; запись на это время ждет"""
+        with self._lock:
+            if self._log is not None:
+                self._log.wait()
+            write_snapshot(snapshot_path, self._by_id.values(), self._next_id, self._seq)
+            if self._log is not None:
+                self._log.truncate()
+
+    def _journal(self, entry):
+        self._seq += 1
+        entry["seq"] = self._seq
+        return self._log.append(entry) if self._log is not None else None
+
+    def _commit(self, ticket):
+        # Ждем fsync вне блокировки: параллельные изменения попадают в ту же группу
+        if ticket is not None:
+            self._log.wait(ticket)
+
+    def _index(self, record):
+        self._by_id[record.id] = record
+        self._by_article[record.article] = record
+        self._by_type.setdefault(record.product_type_id, {})[record.id] = record
+
+    def _unindex(self, record, keep_id=False):
+        if not keep_id:
+            del self._by_id[record.id]
+        del self._by_article[record.article]
+        same_type = self._by_type[record.product_type_id]
+        del same_type[record.id]
+        if not same_type:
+            del self._by_type[record.product_type_id]
+
+
+def open_product_store(data_dir=None):
+    """
+    Создает хранилище продукции. Без каталога — только в памяти из INITIAL_PRODUCTS.
+    С каталогом — загружает последний снимок через mmap, доигрывает журнал
+    и периодически сжимает журнал в новый снимок.
+    """
+    if not data_dir:
+        return ProductStore(INITIAL_PRODUCTS)
+
+    os.makedirs(data_dir, exist_ok=True)
+    snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE)
+    log_path = os.path.join(data_dir, MUTATION_LOG_FILE)
+
+    started = time.perf_counter()
+    store = ProductStore()
+    if os.path.exists(snapshot_path):
+        next_id, seq, rows = read_snapshot(snapshot_path)
+        store.load(rows, next_id, seq)
+    else:
+        store.load(ProductRecord.from_dict(product).to_row() for product in INITIAL_PRODUCTS)
+        store.compact(snapshot_path)
+
+    entries = read_mutation_log(log_path)
+    store.replay(entries)
+    log = MutationLog(log_path)
+    log.entries = len(entries)
+    store.attach_log(log)
+    print(f"💾 Загружено продуктов: {len(store)} (журнал: {len(entries)} изменений) "
+          f"за {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    def compact_periodically():
+        while True:
+            time.sleep(SNAPSHOT_INTERVAL_SECONDS)
+            if log.entries >= SNAPSHOT_MIN_MUTATIONS:
+                store.compact(snapshot_path)
+
+    threading.Thread(target=compact_periodically, name="snapshot", daemon=True).start()
+    return store
+
+
+products = open_product_store(PRODUCTS_DATA_DIR)
+
+
+# ==================== МАРШРУТЫ ПРОИЗВОДСТВА ====================
+
+WORKSHOPS_BY_ID = {workshop["id"]: workshop for workshop in WORKSHOPS}
+
+
+class ProductRouting:
+    """
+    Маршруты продукции по цехам с индексами в обе стороны (продукт → цехи, цех → продукты)
+    и заранее посчитанным суммарным временем производства каждого продукта.
+
+    Каждое изменение поправляет индексы и суммы на месте: добавление и удаление связи — O(1).
+    Чтение идет без блокировок, как в ProductStore.
+    """
+
+    def __init__(self, links=(), workshops=()):
+        self._lock = threading.Lock()
+        self._by_product = {}  # product_id -> {workshop_id: None}, порядок добавления сохраняется
+        self._by_workshop = {}  # workshop_id -> {product_id: None}
+        self._workshop_time = {workshop["id"]: workshop["production_time"] for workshop in workshops}
+        self._total_time = {}
+        self._version = 0
+        self._pairs = (-1, ())
+        for link in links:
+            self.add(link["product_id"], link["workshop_id"])
+
+    def workshops_for(self, product_id):
+        return tuple(self._by_product.get(product_id, {}))
+
+    def products_for(self, workshop_id):
+        return tuple(self._by_workshop.get(workshop_id, {}))
+
+    def total_time(self, product_id):
+        return self._total_time.get(product_id, 0)
+
+    def pairs(self):
+        """Все связи в формате PRODUCT_WORKSHOPS; список строится заново только после изменений"""
+        version, pairs = self._pairs
+        if version == self._version:
+            return pairs
+        version = self._version
+        pairs = tuple(
+            {"product_id": product_id, "workshop_id": workshop_id}
+            for product_id, workshop_ids in tuple(self._by_product.items())
+            for workshop_id in tuple(workshop_ids)
+        )
+        self._pairs = (version, pairs)
+        return pairs
+
+    def add(self, product_id, workshop_id):
+        """Добавляет цех в маршрут продукта; возвращает False, если связь уже есть"""
+        with self._lock:
+            workshop_ids = self._by_product.setdefault(product_id, {})
+            if workshop_id in workshop_ids:
+                return False
+            workshop_ids[workshop_id] = None
+            self._by_workshop.setdefault(workshop_id, {})[product_id] = None
+            self._total_time[product_id] = self._total_time.get(product_id, 0) + self._workshop_time.get(workshop_id, 0)
+            self._version += 1
+            return True
+
+    def remove(self, product_id, workshop_id):
+        """Убирает цех из маршрута продукта; возвращает False, если связи не было"""
+        with self._lock:
+            if workshop_id not in self._by_product.get(product_id, {}):
+                return False
+            self._unlink(product_id, workshop_id)
+            self._version += 1
+            return True
+
+    def remove_product(self, product_id):
+        """Убирает весь маршрут продукта (например, при его удалении)"""
+        with self._lock:
+            for workshop_id in tuple(self._by_product.get(product_id, {})):
+                self._unlink(product_id, workshop_id)
+            self._version += 1
+
+    def _unlink(self, product_id, workshop_id):
+        workshop_ids = self._by_product[product_id]
+        del workshop_ids[workshop_id]
+        if not workshop_ids:
+            del self._by_product[product_id]
+        product_ids = self._by_workshop[workshop_id]
+        del product_ids[product_id]
+        if not product_ids:
+            del self._by_workshop[workshop_id]
+        total = self._total_time.pop(product_id) - self._workshop_time.get(workshop_id, 0)
+        if workshop_ids:
+            self._total_time[product_id] = total
+
+
+# Маршруты удаленных продуктов (в том числе сохраненных до перезапуска) не загружаем
+routing = ProductRouting(
+    (link for link in PRODUCT_WORKSHOPS if products.get(link["product_id"]) is not None),
+    WORKSHOPS
+)
 
 
 # ==================== МЕТОДЫ ====================
 
+# Справочники, проиндексированные по id: коэффициент типа и множитель с учетом потерь
+PRODUCT_TYPE_COEFFICIENTS = {pt["id"]: pt["coefficient"] for pt in PRODUCT_TYPES}
+MATERIAL_WASTE_MULTIPLIERS = {mt["id"]: 1 + (mt["waste_percent"] / 100) for mt in MATERIAL_TYPES}
+
+# Сколько последних расчетов помнит кэш котировок
+QUOTE_CACHE_SIZE = 4096
+
+
+def compute_raw_materials(product_type_id, material_type_id, quantity, param1, param2) -> int:
+    """Расчет сырья без кэша: поиск коэффициентов в словарях по id"""
+    try:
+        coefficient = PRODUCT_TYPE_COEFFICIENTS.get(product_type_id)
+        waste_multiplier = MATERIAL_WASTE_MULTIPLIERS.get(material_type_id)
+    except TypeError:
+        # Нехешируемый id (например, список из JSON) не совпадает ни с одной записью
+        return -1
+
+    if coefficient is None or waste_multiplier is None:
+        return -1
+
+    if quantity <= 0 or param1 <= 0 or param2 <= 0:
+        return -1
+
+    raw_material_per_unit = param1 * param2 * coefficient
+    total_raw_material = raw_material_per_unit * quantity
+    return int(total_raw_material * waste_multiplier + 0.5)
+
+
+cached_raw_materials = functools.lru_cache(maxsize=QUOTE_CACHE_SIZE)(compute_raw_materials)
+
+
 def calculate_raw_materials(product_type_id: int, material_type_id: int, quantity: int, param1: float, param2: float) -> int:
     """
     CORE METHOD: Расчет необходимого количества сырья с учетом потерь
@@ -61,47 +582,157 @@ def calculate_raw_materials(product_type_id: int, material_type_id: int, quantit
         param1, param2 - параметры размера
         
     Возвращает: целое число килограммов или -1 при ошибке
+    Повторные запросы с теми же параметрами берутся из кэша котировок.
     """
-    product_type = next((pt for pt in PRODUCT_TYPES if pt["id"] == product_type_id), None)
-    if not product_type:
-        return -1
+    try:
+        return cached_raw_materials(product_type_id, material_type_id, quantity, param1, param2)
+    except TypeError:
+        # Нехешируемые параметры (например, списки из JSON) считаем без кэша
+        return compute_raw_materials(product_type_id, material_type_id, quantity, param1, param2)
 
-    material_type = next((mt for mt in MATERIAL_TYPES if mt["id"] == material_type_id), None)
-    if not material_type:
-        return -1
 
-    if quantity <= 0 or param1 <= 0 or param2 <= 0:
-        return -1
+# Те же справочники как массивы, индексируемые id (NaN — нет такой записи)
+PRODUCT_TYPE_COEFFICIENT_TABLE = np.full(max(PRODUCT_TYPE_COEFFICIENTS) + 1, np.nan)
+PRODUCT_TYPE_COEFFICIENT_TABLE[list(PRODUCT_TYPE_COEFFICIENTS)] = list(PRODUCT_TYPE_COEFFICIENTS.values())
+MATERIAL_WASTE_MULTIPLIER_TABLE = np.full(max(MATERIAL_WASTE_MULTIPLIERS) + 1, np.nan)
+MATERIAL_WASTE_MULTIPLIER_TABLE[list(MATERIAL_WASTE_MULTIPLIERS)] = list(MATERIAL_WASTE_MULTIPLIERS.values())
+
+
+def lookup_by_id(table, ids):
+    """Значения справочника для массива id; NaN для отсутствующих и нецелых id"""
+    ids = np.asarray(ids, dtype=np.float64)
+    valid = (ids >= 0) & (ids < len(table)) & (ids == np.trunc(ids))
+    values = table[np.where(valid, ids, 0).astype(np.int64)]
+    values[~valid] = np.nan
+    return values
+
+
+def calculate_raw_materials_batch(product_type_ids, material_type_ids=None, quantities=None, param1=None, param2=None) -> np.ndarray:
+    """
+    Векторный вариант calculate_raw_materials для массового расчета.
+
+    Принимает пять массивов одной длины либо одну таблицу (DataFrame или словарь массивов)
+    с колонками product_type_id, material_type_id, quantity, param1, param2.
+
+    Возвращает: массив int64 с тем же округлением int(x + 0.5) и -1 там, где скалярная
+    функция вернула бы -1. NaN, бесконечности и результаты вне int64 тоже дают -1.
+    """
+    if material_type_ids is None:
+        table = product_type_ids
+        product_type_ids = table["product_type_id"]
+        material_type_ids = table["material_type_id"]
+        quantities = table["quantity"]
+        param1 = table["param1"]
+        param2 = table["param2"]
+
+    coefficient = lookup_by_id(PRODUCT_TYPE_COEFFICIENT_TABLE, product_type_ids)
+    waste_multiplier = lookup_by_id(MATERIAL_WASTE_MULTIPLIER_TABLE, material_type_ids)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    param1 = np.asarray(param1, dtype=np.float64)
+    param2 = np.asarray(param2, dtype=np.float64)
+
+    # Порядок операций тот же, что в скалярной функции, — иначе округление может разойтись
+    with np.errstate(invalid="ignore", over="ignore"):
+        raw_material = param1 * param2 * coefficient * quantities * waste_multiplier + 0.5
+        valid = (quantities > 0) & (param1 > 0) & (param2 > 0) & (raw_material < 2.0 ** 63)
+
+    result = np.full(len(raw_material), -1, dtype=np.int64)
+    result[valid] = np.trunc(raw_material[valid]).astype(np.int64)
+    return result
+
+
+# ==================== ГОТОВЫЕ ОТВЕТЫ ДЛЯ СПРАВОЧНИКОВ ====================
+
+class PreEncodedJSON:
+    """
+    JSON-ответ, сериализованный один раз: тело, его gzip-вариант и сильные ETag.
+    Запрос с совпадающим If-None-Match получает 304 без тела.
+    После изменения исходных данных нужно вызвать invalidate() — буферы соберутся заново.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._encoded = None
+
+    def invalidate(self):
+        self._encoded = None
+
+    def encode(self):
+        encoded = self._encoded
+        if encoded is None:
+            body = app.json.response(self._data).get_data()
+            digest = hashlib.sha256(body).hexdigest()[:32]
+            # Сильный ETag у каждого представления свой: байты gzip-варианта другие
+            encoded = {
+                "identity": (body, f'"{digest}"'),
+                "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')
+            }
+            self._encoded = encoded
+        return encoded
+
+    def response(self):
+        encoded = self.encode()
+        # Качество из заголовка: "gzip;q=0" — явный отказ от сжатия
+        encoding = "gzip" if request.accept_encodings["gzip"] > 0 else "identity"
+        body, etag = encoded[encoding]
+
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if encoding == "gzip":
+            headers["Content-Encoding"] = "gzip"
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            return app.response_class(status=304, headers=headers)
+        return app.response_class(body, mimetype="application/json", headers=headers)
 
-    raw_material_per_unit = param1 * param2 * product_type["coefficient"]
-    total_raw_material = raw_material_per_unit * quantity
-    waste_multiplier = 1 + (material_type["waste_percent"] / 100)
-    final_raw_material = int(total_raw_material * waste_multiplier + 0.5)
 
-    return final_raw_material
+PRODUCT_TYPES_RESPONSE = PreEncodedJSON(PRODUCT_TYPES)
+MATERIAL_TYPES_RESPONSE = PreEncodedJSON(MATERIAL_TYPES)
+WORKSHOPS_RESPONSE = PreEncodedJSON(WORKSHOPS)
 
 
 # ==================== API ENDPOINTS ====================
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
-    return jsonify(products)
+    return jsonify([product.to_dict() for product in products.snapshot()])
 
 @app.route('/api/product-types', methods=['GET'])
 def get_product_types():
-    return jsonify(PRODUCT_TYPES)
+    return PRODUCT_TYPES_RESPONSE.response()
 
 @app.route('/api/material-types', methods=['GET'])
 def get_material_types():
-    return jsonify(MATERIAL_TYPES)
+    return MATERIAL_TYPES_RESPONSE.response()
 
 @app.route('/api/workshops', methods=['GET'])
 def get_workshops():
-    return jsonify(WORKSHOPS)
+    return WORKSHOPS_RESPONSE.response()
 
 @app.route('/api/product-workshops', methods=['GET'])
 def get_product_workshops():
-    return jsonify(PRODUCT_WORKSHOPS)
+    return jsonify(list(routing.pairs()))
+
+@app.route('/api/products/<int:product_id>/workshops', methods=['GET'])
+def get_product_route(product_id):
+    if products.get(product_id) is None:
+        return jsonify({"error": "Продукт не найден"}), 404
+    return jsonify({
+        "product_id": product_id,
+        "workshops": [WORKSHOPS_BY_ID[workshop_id] for workshop_id in routing.workshops_for(product_id)],
+        "total_production_time": routing.total_time(product_id)
+    })
+
+@app.route('/api/workshops/<int:workshop_id>/products', methods=['GET'])
+def get_workshop_products(workshop_id):
+    if workshop_id not in WORKSHOPS_BY_ID:
+        return jsonify({"error": "Цех не найден"}), 404
+    workshop_products = (products.get(product_id) for product_id in routing.products_for(workshop_id))
+    return jsonify({
+        "workshop_id": workshop_id,
+        "products": [product.to_dict() for product in workshop_products if product is not None]
+    })
 
 @app.route('/api/calculate-raw-materials', methods=['POST'])
 def api_calculate_raw_materials():
@@ -117,8 +748,8 @@ def api_calculate_raw_materials():
 
 @app.route('/api/delete-product/<int:product_id>', methods=['DELETE'])
 def delete_product(product_id):
-    global products
-    products = [p for p in products if p["id"] != product_id]
+    products.delete(product_id)
+    routing.remove_product(product_id)
     return jsonify({"success": True})
 
 
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Планирование загрузки цехов Premium Furniture Solutions по портфелю заказов
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+# ==================== НАСТРОЙКИ ПЛАНИРОВАНИЯ ====================
+# Горизонт планирования по умолчанию: рабочая неделя одного сотрудника, ч
+PLANNING_HORIZON_HOURS = 40
+# Цех — узкое место, если его загрузка (человеко-часы / фонд за горизонт) выше порога
+BOTTLENECK_UTILIZATION = 1.0
+
+# Модель мощности: manufacturing_time_hours — трудоемкость одного изделия для одного
+# сотрудника цеха, staff_count — сколько изделий цех обрабатывает одновременно.
+# Партия проходит цех волнами по staff_count изделий (batch_hours); этой моделью пользуются
+# plan_capacity, schedule_orders и compute_lead_time, поэтому для одного заказа они дают одинаковые сроки.
+
+ROUTES_QUERY = """
+    SELECT product_id, workshop_id, manufacturing_time_hours
+    FROM product_workshops
+"""
+
+WORKSHOPS_QUERY = """
+    SELECT workshop_id, workshop_name, workshop_type, staff_count
+    FROM workshops
+    ORDER BY workshop_id
+"""
+
+
+def batch_hours(quantity, staff_count, hours):
+    """
+    Время обработки партии в цехе: ceil(quantity / staff_count) волн по hours ч.
+    Принимает числа и массивы; цех без сотрудников партию не выполнит (inf).
+    """
+    with np.errstate(divide='ignore'):
+        return np.ceil(np.divide(quantity, staff_count)) * hours
+
+
+def fetch_frame(cursor, query, params=None):
+    """Результат запроса как DataFrame (подходит и обычный курсор, и RealDictCursor)"""
+    cursor.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        rows = [[row[column] for column in columns] for row in rows]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def load_planning_data(cursor):
+    """Загружает маршруты и цехи: (routes, workshops)"""
+    routes = fetch_frame(cursor, ROUTES_QUERY)
+    routes['manufacturing_time_hours'] = routes['manufacturing_time_hours'].astype(float)
+    workshops = fetch_frame(cursor, WORKSHOPS_QUERY)
+    return routes, workshops
+
+
+def orders_frame(orders):
+    """Приводит портфель заказов (список словарей, пар или DataFrame) к колонкам product_id, quantity"""
+    if isinstance(orders, pd.DataFrame):
+        frame = orders[['product_id', 'quantity']]
+    elif orders and isinstance(orders[0], dict):
+        frame = pd.DataFrame(
+            {'product_id': [order.get('product_id') for order in orders],
+             'quantity': [order.get('quantity') for order in orders]}
+        )
+    else:
+        frame = pd.DataFrame(list(orders), columns=['product_id', 'quantity'])
+    return pd.DataFrame({
+        'product_id': pd.to_numeric(frame['product_id'], errors='raise').astype(np.int64),
+        'quantity': pd.to_numeric(frame['quantity'], errors='raise').astype(float)
+    })
+
+
+def plan_capacity(orders, routes, workshops, horizon_hours=PLANNING_HORIZON_HOURS):
+    """
+    Загрузка цехов портфелем заказов.
+
+    Для каждого цеха: трудоемкость в человеко-часах, доступный фонд за горизонт
+    (staff_count × horizon_hours) и загрузка — их отношение. required_hours — нижняя оценка
+    времени всем составом: не меньше person_hours / staff_count и не меньше самой долгой
+    партии по batch_hours (для одного продукта совпадает со сроком schedule_orders);
+    sequential_hours — время, если партии продуктов идут одна за другой.
+    Узкие места — цехи с загрузкой выше BOTTLENECK_UTILIZATION.
+    """
+    orders = orders_frame(orders)
+    if not np.isfinite(orders['quantity']).all() or (orders['quantity'] <= 0).any():
+        raise ValueError("Количество в заказе должно быть положительным числом")
+    if not math.isfinite(horizon_hours) or horizon_hours <= 0:
+        raise ValueError("Горизонт планирования должен быть положительным")
+
+    # Сворачиваем строки портфеля по продуктам — дальше работаем с уникальными продуктами
+    quantities = orders.groupby('product_id', sort=False)['quantity'].sum()
+
+    routed = routes[routes['product_id'].isin(quantities.index)]
+    routed_hours = routed['manufacturing_time_hours'].to_numpy()
+    routed_quantity = quantities.reindex(routed['product_id']).to_numpy()
+    routed_staff = routed['workshop_id'].map(
+        pd.Series(workshops['staff_count'].to_numpy(dtype=float), index=workshops['workshop_id'])
+    ).to_numpy()
+    routed_workshops = routed['workshop_id'].to_numpy()
+    load = pd.Series(routed_hours * routed_quantity).groupby(routed_workshops).sum()
+    batches = pd.Series(batch_hours(routed_quantity, routed_staff, routed_hours)).groupby(routed_workshops)
+
+    staff = workshops['staff_count'].to_numpy(dtype=float)
+    workshop_load = load.reindex(workshops['workshop_id']).fillna(0.0).to_numpy()
+    longest_batch = batches.max().reindex(workshops['workshop_id']).fillna(0.0).to_numpy()
+    sequential_batches = batches.sum().reindex(workshops['workshop_id']).fillna(0.0).to_numpy()
+    capacity = staff * horizon_hours
+    utilization = np.divide(workshop_load, capacity, out=np.zeros_like(workshop_load), where=capacity > 0)
+    shared_hours = np.divide(workshop_load, staff, out=np.zeros_like(workshop_load), where=staff > 0)
+    required_hours = np.where(staff > 0, np.maximum(shared_hours, longest_batch), 0.0)
+    sequential_hours = np.where(staff > 0, sequential_batches, 0.0)
+    bottleneck = utilization > BOTTLENECK_UTILIZATION
+
+    result = pd.DataFrame({
+        'workshop_id': workshops['workshop_id'].to_numpy(),
+        'workshop_name': workshops['workshop_name'].to_numpy(),
+        'staff_count': workshops['staff_count'].to_numpy(),
+        'person_hours': workshop_load.round(2),
+        'capacity_hours': capacity.round(2),
+        'utilization': utilization.round(4),
+        'required_hours': required_hours.round(2),
+        'sequential_hours': sequential_hours.round(2),
+        'bottleneck': bottleneck
+    })
+
+    result = result.sort_values('utilization', ascending=False, kind='stable')
+    unrouted = quantities.index.difference(pd.Index(routes['product_id'].unique()))
+
+    return {
+        'horizon_hours': horizon_hours,
+        'order_lines': len(orders),
+        'products': len(quantities),
+        'total_person_hours': round(float(workshop_load.sum()), 2),
+        'completion_hours': round(float(required_hours.max()), 2) if len(required_hours) else 0.0,
+        'workshops': result.to_dict(orient='records'),
+        'bottlenecks': result.loc[result['bottleneck'], 'workshop_id'].tolist(),
+        'unrouted_products': unrouted.tolist()
+    }
+
+
+# ==================== ПЛАНИРОВАНИЕ С УЧЕТОМ МОЩНОСТИ ЦЕХОВ ====================
+# Порядок этапов маршрута по типу цеха; цехи одного этапа работают над заказом параллельно.
+# Цехи неизвестного типа выполняются после всех известных этапов.
+STAGE_ORDER = ['Проектирование', 'Обработка', 'Сушка', 'Сборка']
+
+# Виды событий модели; при равном времени завершение обрабатывается раньше запуска,
+# чтобы освободившиеся места сразу были доступны
+EVENT_FINISH = 0
+EVENT_RELEASE = 1
+
+
+def stage_rank(workshop_type):
+    """Номер этапа для типа цеха"""
+    try:
+        return STAGE_ORDER.index(workshop_type)
+    except ValueError:
+        return len(STAGE_ORDER)
+
+
+def build_route_stages(routes, workshops):
+    """
+    Маршруты как последовательности этапов:
+    product_id -> [[(workshop_id, часы), ...], ...] в порядке STAGE_ORDER
+    """
+    ranks = {row.workshop_id: (stage_rank(row.workshop_type), row.workshop_type)
+             for row in workshops.itertuples(index=False)}
+    staged = routes.assign(
+        stage=[ranks.get(workshop_id, (len(STAGE_ORDER), ''))
+               for workshop_id in routes['workshop_id'].tolist()]
+    ).sort_values(['product_id', 'stage', 'workshop_id'], kind='stable')
+
+    stages = {}
+    current_product = None
+    current_stage = None
+    for product_id, workshop_id, hours, stage in zip(
+        staged['product_id'].tolist(), staged['workshop_id'].tolist(),
+        staged['manufacturing_time_hours'].tolist(), staged['stage'].tolist()
+    ):
+        if product_id != current_product:
+            stages[product_id] = []
+            current_product, current_stage = product_id, None
+        if stage != current_stage:
+            stages[product_id].append([])
+            current_stage = stage
+        stages[product_id][-1].append((workshop_id, float(hours)))
+    return stages
+
+
+def normalize_orders(orders):
+    """Заказы для планировщика: order_id, product_id, quantity, priority, release_hours"""
+    if isinstance(orders, pd.DataFrame):
+        orders = orders.to_dict(orient='records')
+    normalized = []
+    for index, order in enumerate(orders):
+        if not isinstance(order, dict):
+            order = dict(zip(('product_id', 'quantity'), order))
+        quantity = float(order['quantity'])
+        release_hours = float(order.get('release_hours', 0))
+        priority = float(order.get('priority', 0))
+        if not math.isfinite(quantity) or quantity <= 0:
+            raise ValueError("Количество в заказе должно быть положительным числом")
+        if not math.isfinite(release_hours) or release_hours < 0:
+            raise ValueError("Время поступления заказа должно быть неотрицательным числом")
+        if not math.isfinite(priority):
+            raise ValueError("Приоритет заказа должен быть числом")
+        normalized.append((
+            order.get('order_id', index + 1),
+            int(order['product_id']),
+            quantity,
+            priority,
+            release_hours
+        ))
+    return normalized
+
+
+def schedule_orders(orders, routes, workshops, include_operations=False):
+    """
+    Расписание портфеля заказов с учетом ограниченной мощности цехов (дискретно-событийная модель).
+
+    Операция заказа в цехе делит партию (ceil(quantity) изделий) поровну между свободными
+    местами цеха, не больше одного места на изделие; каждое место обрабатывает свою часть
+    изделие за изделием по manufacturing_time_hours ч. В пустом цехе операция длится batch_hours.
+    Этапы маршрута идут по порядку, цехи одного этапа работают параллельно. Очередь цеха
+    упорядочена по priority (меньше — важнее), затем по времени готовности и порядку поступления.
+
+    Возвращает сроки начала и окончания по заказам и по цехам, а также makespan.
+    """
+    orders = normalize_orders(orders)
+    stages = build_route_stages(routes, workshops)
+    staff = dict(zip(workshops['workshop_id'].tolist(), workshops['staff_count'].tolist()))
+    free = dict(staff)
+    queues = {workshop_id: [] for workshop_id in staff}
+
+    order_start = [None] * len(orders)
+    order_finish = [None] * len(orders)
+    order_stage = [0] * len(orders)
+    stage_remaining = [0] * len(orders)
+    # (индекс заказа, цех) -> [мест в работе, время запуска операции]
+    running = {}
+    busy = dict.fromkeys(staff, 0.0)
+    first_start = {}
+    last_finish = {}
+    operations = []
+
+    events = []
+    sequence = 0
+    for index, (_, product_id, _, _, release_hours) in enumerate(orders):
+        if product_id in stages:
+            events.append((release_hours, EVENT_RELEASE, sequence, index, None))
+            sequence += 1
+        else:
+            order_start[index] = order_finish[index] = release_hours
+    heapq.heapify(events)
+
+    def dispatch(workshop_id, now):
+        nonlocal sequence
+        queue = queues[workshop_id]
+        while free[workshop_id] > 0 and queue:
+            _, _, _, index, hours = heapq.heappop(queue)
+            items = math.ceil(orders[index][2])
+            slots = min(free[workshop_id], items)
+            free[workshop_id] -= slots
+            running[index, workshop_id] = [slots, now]
+            if order_start[index] is None:
+                order_start[index] = now
+            if workshop_id not in first_start:
+                first_start[workshop_id] = now
+            busy[workshop_id] += items * hours
+            base, extra = divmod(items, slots)
+            for slot in range(slots):
+                finish = now + (base + (slot < extra)) * hours
+                heapq.heappush(events, (finish, EVENT_FINISH, sequence, index, workshop_id))
+                sequence += 1
+
+    while events:
+        now, kind, _, index, workshop_id = heapq.heappop(events)
+        _, product_id, _, priority, _ = orders[index]
+
+        if kind == EVENT_FINISH:
+            free[workshop_id] += 1
+            last_finish[workshop_id] = now
+            operation = running[index, workshop_id]
+            operation[0] -= 1
+            if operation[0] == 0:
+                del running[index, workshop_id]
+                if include_operations:
+                    operations.append((orders[index][0], workshop_id, operation[1], now))
+                stage_remaining[index] -= 1
+                if stage_remaining[index] == 0:
+                    order_stage[index] += 1
+                    if order_stage[index] < len(stages[product_id]):
+                        heapq.heappush(events, (now, EVENT_RELEASE, sequence, index, None))
+                        sequence += 1
+                    else:
+                        order_finish[index] = now
+            dispatch(workshop_id, now)
+            continue
+
+        # Заказ готов к очередному этапу: ставим операции в очереди всех цехов этапа
+        stage = stages[product_id][order_stage[index]]
+        stage_remaining[index] = len(stage)
+        for stage_workshop_id, hours in stage:
+            if stage_workshop_id not in queues:
+                raise ValueError(f"Цех {stage_workshop_id} из маршрута продукта {product_id} не найден")
+            heapq.heappush(queues[stage_workshop_id], (priority, now, sequence, index, hours))
+            sequence += 1
+        for stage_workshop_id, _ in stage:
+            dispatch(stage_workshop_id, now)
+
+    makespan = max(order_finish, default=0.0)
+    names = dict(zip(workshops['workshop_id'].tolist(), workshops['workshop_name'].tolist()))
+
+    result = {
+        'makespan_hours': round(makespan, 2),
+        'orders': [
+            {
+                'order_id': order_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'start_hours': round(order_start[index], 2),
+                'finish_hours': round(order_finish[index], 2),
+                'lead_hours': round(order_finish[index] - release_hours, 2),
+                'routed': product_id in stages
+            }
+            for index, (order_id, product_id, quantity, _, release_hours) in enumerate(orders)
+        ],
+        'workshops': [
+            {
+                'workshop_id': workshop_id,
+                'workshop_name': names[workshop_id],
+                'staff_count': staff[workshop_id],
+                'busy_hours': round(busy[workshop_id], 2),
+                'start_hours': round(first_start[workshop_id], 2) if workshop_id in first_start else None,
+                'finish_hours': round(last_finish[workshop_id], 2) if workshop_id in last_finish else None,
+                'utilization': round(busy[workshop_id] / (staff[workshop_id] * makespan), 4)
+                               if makespan > 0 and staff[workshop_id] > 0 else 0.0
+            }
+            for workshop_id in staff
+        ]
+    }
+    if include_operations:
+        result['operations'] = [
+            {'order_id': order_id, 'workshop_id': workshop_id,
+             'start_hours': round(start, 2), 'finish_hours': round(finish, 2)}
+            for order_id, workshop_id, start, finish in operations
+        ]
+    return result
+
+
+# ==================== СРОК ИЗГОТОВЛЕНИЯ ПО КРИТИЧЕСКОМУ ПУТИ ====================
+
+ROUTE_DETAILS_QUERY = """
+    SELECT
+        pw.product_id,
+        pw.workshop_id,
+        w.workshop_name,
+        w.workshop_type,
+        w.staff_count,
+        pw.manufacturing_time_hours
+    FROM product_workshops pw
+    JOIN workshops w ON w.workshop_id = pw.workshop_id
+    WHERE pw.product_id = ANY(%s)
+"""
+
+
+def load_route_models(cursor, product_ids):
+    """
+    Маршруты продуктов как последовательности этапов (по STAGE_ORDER) одним запросом:
+    product_id -> [{'stage': тип цеха, 'workshops': [{workshop_id, workshop_name, staff_count, hours}]}]
+    Продукты без маршрута получают пустой список.
+    """
+    return route_models(fetch_frame(cursor, ROUTE_DETAILS_QUERY, (list(product_ids),)), product_ids)
+
+
+def route_models(routes, product_ids):
+    """Маршруты продуктов из строк с колонками ROUTE_DETAILS_QUERY"""
+    models = {product_id: [] for product_id in product_ids}
+    if routes.empty:
+        return models
+
+    routes = routes.assign(rank=routes['workshop_type'].map(stage_rank))
+    routes = routes.sort_values(['product_id', 'rank', 'workshop_type', 'workshop_id'], kind='stable')
+    for row in routes.itertuples(index=False):
+        stages = models[row.product_id]
+        if not stages or stages[-1]['stage'] != row.workshop_type:
+            stages.append({'stage': row.workshop_type, 'workshops': []})
+        stages[-1]['workshops'].append({
+            'workshop_id': row.workshop_id,
+            'workshop_name': row.workshop_name,
+            'staff_count': row.staff_count,
+            'hours': float(row.manufacturing_time_hours)
+        })
+    return models
+
+
+def compute_lead_time(route, quantity=1):
+    """
+    Срок изготовления партии по маршруту из этапов.
+
+    В цехе партия обрабатывается волнами по staff_count изделий параллельно (batch_hours):
+    ceil(quantity / staff_count) × часы на изделие. Цехи одного этапа работают одновременно,
+    поэтому этап длится столько, сколько самый долгий из них; срок — сумма этапов (критический путь).
+    """
+    if quantity <= 0:
+        raise ValueError("Количество должно быть положительным")
+
+    stages = []
+    critical_path = []
+    lead_time = 0.0
+    work_hours = 0.0
+
+    for stage in route:
+        workshops = []
+        for workshop in stage['workshops']:
+            stage_hours = float(batch_hours(quantity, workshop['staff_count'], workshop['hours']))
+            workshops.append({**workshop, 'stage_hours': round(stage_hours, 2)})
+            work_hours += workshop['hours'] * quantity
+        critical = max(workshops, key=lambda workshop: workshop['stage_hours'])
+        lead_time += critical['stage_hours']
+        critical_path.append(critical['workshop_name'])
+        stages.append({
+            'stage': stage['stage'],
+            'hours': critical['stage_hours'],
+            'critical_workshop': critical['workshop_name'],
+            'workshops': workshops
+        })
+
+    return {
+        'quantity': quantity,
+        'lead_time_hours': round(lead_time, 2),
+        'work_hours': round(work_hours, 2),
+        'critical_path': critical_path,
+        'stages': stages
+    }
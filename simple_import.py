@@ -4,12 +4,66 @@
 """
 
 import os
+import re
 import sys
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
+# Открывающий/закрывающий тег блока в долларовых кавычках: $$ или $тег$
+DOLLAR_QUOTE = re.compile(r'\$[A-Za-z_]*\$')
+
+def split_sql_script(sql_script):
+    """
+    Делит SQL-скрипт на команды по ';' вне строк, комментариев и блоков $$...$$
+    (тела функций PL/pgSQL). Комментарии '--' отбрасываются.
+    """
+    commands = []
+    current = []
+    dollar_tag = None
+    in_string = False
+    i = 0
+    
+    while i < len(sql_script):
+        char = sql_script[i]
+        if dollar_tag:
+            if sql_script.startswith(dollar_tag, i):
+                current.append(dollar_tag)
+                i += len(dollar_tag)
+                dollar_tag = None
+                continue
+        elif in_string:
+            if char == "'":
+                in_string = False
+        elif char == "'":
+            in_string = True
+        elif sql_script.startswith('--', i):
+            line_end = sql_script.find('\n', i)
+            i = len(sql_script) if line_end == -1 else line_end
+            continue
+        elif char == '$':
+            match = DOLLAR_QUOTE.match(sql_script, i)
+            if match:
+                dollar_tag = match.group()
+                current.append(dollar_tag)
+                i = match.end()
+                continue
+        elif char == ';':
+            command = ''.join(current).strip()
+            if command:
+                commands.append(command)
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    
+    command = ''.join(current).strip()
+    if command:
+        commands.append(command)
+    return commands
+
 def create_database():
     """Создает базу данных если она не существует"""
     try:
@@ -84,15 +138,12 @@ def execute_sql_file():
         
         print("📦 Создание таблиц...")
         
-        # Выполняем скрипт по частям
-        commands = sql_script.split(';')
-        for command in commands:
-            command = command.strip()
-            if command and not command.startswith('--'):
-                try:
-                    cursor.execute(command)
-                except Exception as e:
-                    print(f"⚠️  Пропущена команда: {e}")
+        # Выполняем скрипт по частям (функции и триггеры содержат ';' внутри $$)
+        for command in split_sql_script(sql_script):
+            try:
+                cursor.execute(command)
+            except Exception as e:
+                print(f"⚠️  Пропущена команда: {e}")
         
         conn.commit()
         cursor.close()
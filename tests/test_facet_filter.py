@@ -0,0 +1,22 @@
+"""Разбор фильтра фасетов каталога"""
+
+from decimal import Decimal
+
+import pytest
+
+from app_with_postgresql import app, facet_filter
+
+
+def test_prices_are_parsed_as_decimal():
+    with app.test_request_context('/?min_price=100.50&max_price=2000&product_type_id=3'):
+        assert facet_filter() == {
+            'product_type_id': 3, 'material_type_id': None,
+            'min_price': Decimal('100.50'), 'max_price': Decimal('2000')
+        }
+
+
+@pytest.mark.parametrize('value', ['NaN', 'nan', 'sNaN', 'Infinity', '-Infinity', 'inf'])
+def test_non_finite_prices_are_rejected(value):
+    with app.test_request_context('/?min_price=' + value):
+        with pytest.raises(ValueError):
+            facet_filter()
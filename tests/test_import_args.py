@@ -0,0 +1,27 @@
+"""Разбор аргументов командной строки импорта"""
+
+import sys
+
+import pytest
+
+import import_excel_data as importer
+
+
+def parse(*argv, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['import_excel_data.py', *argv])
+    return importer.parse_args()
+
+
+def test_workers_default(monkeypatch):
+    assert parse(monkeypatch=monkeypatch).workers == importer.IMPORT_WORKERS
+
+
+@pytest.mark.parametrize('value', ['0', '-1', 'два', '1.5'])
+def test_workers_rejects_non_positive(value, monkeypatch):
+    with pytest.raises(SystemExit) as exc:
+        parse('--workers', value, monkeypatch=monkeypatch)
+    assert exc.value.code == 2
+
+
+def test_workers_accepts_positive(monkeypatch):
+    assert parse('--workers', '3', monkeypatch=monkeypatch).workers == 3
@@ -0,0 +1,69 @@
+"""Дифференциальный импорт продукции на рабочей БД (изменения откатываются после теста)"""
+
+import pandas as pd
+import psycopg2
+import pytest
+
+import import_excel_data as importer
+
+
+@pytest.fixture
+def cursor():
+    try:
+        conn = psycopg2.connect(**importer.DB_CONFIG)
+    except psycopg2.OperationalError:
+        pytest.skip('БД из DB_CONFIG недоступна')
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass('products') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        conn.close()
+        pytest.skip('схема PremiumFurnitureSolutions.sql не развернута')
+    yield cursor
+    conn.rollback()
+    conn.close()
+
+
+def fetch_products(cursor, limit=None):
+    cursor.execute(
+        """
+        SELECT pt.product_type_name, p.product_name, p.article_number,
+               p.minimum_partner_price, mt.material_type_name
+        FROM products p
+        JOIN product_types pt USING (product_type_id)
+        JOIN material_types mt USING (material_type_id)
+        ORDER BY p.product_id
+        """ + (f" LIMIT {limit}" if limit else "")
+    )
+    columns = ['product_type_name', 'product_name', 'article_number',
+               'minimum_partner_price', 'material_type_name']
+    return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+
+def test_article_swap_is_applied(cursor):
+    products = fetch_products(cursor, limit=2)
+    if len(products) < 2:
+        pytest.skip('в БД меньше двух изделий')
+    swapped = products.copy()
+    swapped['article_number'] = products['article_number'].values[::-1]
+
+    importer.ensure_row_hash_table(cursor)
+    summary = {'products': {}}
+    importer.upsert_changed_rows(cursor, 'products', swapped, summary)
+
+    assert summary['products']['updated'] == 2
+    articles = fetch_products(cursor).set_index('product_name')['article_number']
+    for name, article in zip(swapped['product_name'], swapped['article_number']):
+        assert articles[name] == article
+
+
+def test_article_taken_from_product_outside_batch_fails(cursor):
+    products = fetch_products(cursor, limit=2)
+    if len(products) < 2:
+        pytest.skip('в БД меньше двух изделий')
+    # Второе изделие в загрузку не попало и свой артикул не отдает
+    taken = products.iloc[[0]].copy()
+    taken['article_number'] = products['article_number'].iloc[1]
+
+    importer.ensure_row_hash_table(cursor)
+    with pytest.raises(psycopg2.errors.UniqueViolation):
+        importer.upsert_changed_rows(cursor, 'products', taken, {'products': {}})
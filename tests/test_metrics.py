@@ -0,0 +1,31 @@
+"""Учет HTTP-запросов в /metrics, в том числе упавших с необработанным исключением"""
+
+import pytest
+
+from app_with_postgresql import METRICS, app
+
+
+@app.route('/test-metrics/fail')
+def failing_view():
+    raise RuntimeError('сбой обработчика')
+
+
+def request_count(route, status):
+    prefix = f'http_requests_total{{method="GET",route="{route}",status="{status}"}} '
+    for line in METRICS.render({}).splitlines():
+        if line.startswith(prefix):
+            return int(line[len(prefix):])
+    return 0
+
+
+@pytest.mark.parametrize('propagate', [False, True])
+def test_unhandled_error_is_counted(propagate, monkeypatch):
+    monkeypatch.setitem(app.config, 'PROPAGATE_EXCEPTIONS', propagate)
+    before = request_count('/test-metrics/fail', 500)
+    client = app.test_client()
+    if propagate:
+        with pytest.raises(RuntimeError):
+            client.get('/test-metrics/fail')
+    else:
+        assert client.get('/test-metrics/fail').status_code == 500
+    assert request_count('/test-metrics/fail', 500) == before + 1
@@ -0,0 +1,24 @@
+"""Разбор limit и offset для постраничных ответов поиска"""
+
+import pytest
+
+from app_with_postgresql import app, page_params
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', (20, 0)),
+    ('limit=5', (5, 0)),
+    ('limit=100&offset=40', (100, 40)),
+])
+def test_valid_values(query, expected):
+    with app.test_request_context('/?' + query):
+        assert page_params(20, 100) == expected
+
+
+@pytest.mark.parametrize('query', [
+    'limit=abc', 'limit=', 'limit=1.5', 'limit=0', 'limit=-1', 'limit=101', 'offset=x', 'offset=-1'
+])
+def test_invalid_values_are_rejected(query):
+    with app.test_request_context('/?' + query):
+        with pytest.raises(ValueError):
+            page_params(20, 100)
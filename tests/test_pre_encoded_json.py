@@ -0,0 +1,21 @@
+"""Выбор представления PreEncodedJSON по заголовку Accept-Encoding"""
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0.5, identity', 'gzip'),
+    ('*', 'gzip'),
+    ('gzip;q=0', None),
+    ('gzip;q=0, deflate', None),
+    ('deflate', None),
+    ('', None),
+])
+def test_gzip_follows_quality(accept, encoding):
+    headers = {'Accept-Encoding': accept} if accept else {}
+    with main.app.test_request_context(headers=headers):
+        response = main.PRODUCT_TYPES_RESPONSE.response()
+    assert response.headers.get('Content-Encoding') == encoding
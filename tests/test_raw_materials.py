@@ -0,0 +1,79 @@
+"""
+Свойство векторного расчета сырья: calculate_raw_materials_batch совпадает
+с compute_raw_materials на каждой строке
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+
+def make_quote_frame(rows, seed):
+    """Случайные запросы, включая несуществующие и нецелые id и неположительные размеры"""
+    rng = np.random.default_rng(seed)
+    product_type_ids = rng.integers(-1, 7, rows).astype(float)
+    product_type_ids[rng.random(rows) < 0.05] += 0.5
+    return pd.DataFrame({
+        'product_type_id': product_type_ids,
+        'material_type_id': rng.integers(-1, 7, rows),
+        'quantity': rng.integers(-2, 10000, rows),
+        'param1': np.round(rng.uniform(-1, 10, rows), rng.integers(0, 6)),
+        'param2': rng.uniform(-1, 10, rows)
+    })
+
+
+def scalar_results(frame):
+    """Построчный расчет; целые id передаются как int — так их присылает API"""
+    return np.array([
+        main.compute_raw_materials(int(pt) if float(pt).is_integer() else pt, int(mt), int(q), p1, p2)
+        for pt, mt, q, p1, p2 in frame.itertuples(index=False, name=None)
+    ], dtype=np.int64)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_matches_scalar(seed):
+    frame = make_quote_frame(20000, seed)
+    np.testing.assert_array_equal(main.calculate_raw_materials_batch(frame), scalar_results(frame))
+
+
+def test_batch_accepts_separate_arrays():
+    frame = make_quote_frame(1000, 42)
+    batch = main.calculate_raw_materials_batch(*(frame[column].to_numpy() for column in frame.columns))
+    np.testing.assert_array_equal(batch, main.calculate_raw_materials_batch(frame))
+
+
+def test_unknown_product_ids():
+    unknown = [0, max(main.PRODUCT_TYPE_COEFFICIENTS) + 1, 10 ** 6, -5, 1.5]
+    frame = pd.DataFrame({
+        'product_type_id': unknown,
+        'material_type_id': [1] * len(unknown),
+        'quantity': [10] * len(unknown),
+        'param1': [2.0] * len(unknown),
+        'param2': [3.0] * len(unknown)
+    })
+    assert main.calculate_raw_materials_batch(frame).tolist() == [-1] * len(unknown)
+    assert scalar_results(frame).tolist() == [-1] * len(unknown)
+
+
+def test_zero_quantity():
+    frame = pd.DataFrame({
+        'product_type_id': [1, 1],
+        'material_type_id': [1, 1],
+        'quantity': [0, 1],
+        'param1': [2.0, 2.0],
+        'param2': [3.0, 3.0]
+    })
+    batch = main.calculate_raw_materials_batch(frame)
+    assert batch[0] == -1
+    assert batch[1] > 0
+    np.testing.assert_array_equal(batch, scalar_results(frame))
+
+
+def test_empty_batch():
+    frame = make_quote_frame(0, 0)
+    batch = main.calculate_raw_materials_batch(frame)
+    assert batch.dtype == np.int64
+    assert len(batch) == 0
+    assert len(main.calculate_raw_materials_batch([], [], [], [], [])) == 0